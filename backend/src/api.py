@@ -1,16 +1,81 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, WebSocket, WebSocketDisconnect, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from typing import List, Optional
+from functools import partial
 import numpy as np
-import tempfile
+import asyncio
 import io
-import base64
+import re
 import os
-from lib.utils import load_audio_file, save_audio_file
-from main import main
-from lib.square import square_wave_maker
+import json
+import logging
+import zipfile
+from contextlib import asynccontextmanager
+from lib.utils import read_audio_chunks, wav_stream_header, encode_pcm16, RESAMPLE_QUALITIES, DTYPES
+from lib.square import iterative_square_wave_stream
+from pipeline import process_upload, process_batch, warm_up
+from pool import ProcessingPool, PoolSaturated, ProgressReporter
+from results import ResultStore, ResultTooLarge
+from cache import ResultCache, ContentHasher, HASH_CHUNK_BYTES
+from jobs import JobStore
+from lib2.stream_session import StreamSession
 
-app = FastAPI()
+SAMPLE_RATE = 44100
+WINDOW_SIZE = 10000
+MAX_FRAME_SECONDS = 1.0
+# Limits on what a streaming session may ask for, since frame size and graph state scale with them
+MAX_STREAM_SAMPLE_RATE = 192000
+MAX_STREAM_WINDOW = 65536
+PLOT_MEDIA_TYPES = {'png': 'image/png', 'json': 'application/json'}
+MAX_PLOT_DPI = 300
+MAX_BATCH_FILES = int(os.environ.get('SYNTHFUZZ_MAX_BATCH_FILES', 500))
+# Most audio a batch may carry, counting archive members at their uncompressed size
+MAX_BATCH_BYTES = int(os.environ.get('SYNTHFUZZ_MAX_BATCH_BYTES', 512 * 1024 * 1024))
+RETRY_AFTER_SECONDS = int(os.environ.get('SYNTHFUZZ_RETRY_AFTER', 5))
+# Float precision uploads are processed in unless a request asks for another
+DEFAULT_DTYPE = os.environ.get('SYNTHFUZZ_DTYPE', 'float32')
+# Spawn and warm the workers at startup; when off they start on the first request instead
+WARM_UP = os.environ.get('SYNTHFUZZ_WARM_UP', '1') != '0'
+
+# CPU-bound requests run in pre-warmed worker processes so the event loop only does I/O
+jobs = JobStore()
+pool = ProcessingPool(initializer=warm_up if WARM_UP else None, on_progress=jobs.progress)
+results = ResultStore()
+cache = ResultCache()
+# Keeps running job tasks referenced until they finish
+job_tasks = set()
+# Cache key -> id of the job computing it, so identical jobs can mirror its progress
+job_leaders = {}
+logger = logging.getLogger(__name__)
+
+def warm_up_server():
+    pool.start()
+    # Streams filter in this process, which otherwise loads scipy.signal on the first one
+    import scipy.signal  # noqa: F401
+
+def warming_done(task):
+    # Requests start the pool themselves if warming up failed, so this only needs reporting
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Warming up the server failed", exc_info=task.exception())
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warming up runs in the background so the server takes requests straight away;
+    # anything that needs a worker before then waits for the pool to start
+    warming = None
+    if WARM_UP:
+        warming = asyncio.create_task(run_in_threadpool(warm_up_server))
+        warming.add_done_callback(warming_done)
+    yield
+    if warming is not None:
+        warming.cancel()
+        # Its failure, if any, was logged when it finished
+        await asyncio.gather(warming, return_exceptions=True)
+    pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for both development and production servers
 app.add_middleware(
@@ -25,67 +90,106 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def invalid_options(options: dict):
+    if options['plot_format'] not in PLOT_MEDIA_TYPES or not 0 < options['plot_dpi'] <= MAX_PLOT_DPI:
+        message = f"plot_format must be one of {sorted(PLOT_MEDIA_TYPES)} and plot_dpi at most {MAX_PLOT_DPI}"
+    elif options['resample_quality'] not in RESAMPLE_QUALITIES:
+        message = f"resample_quality must be one of {sorted(RESAMPLE_QUALITIES)}"
+    elif options['dtype'] not in DTYPES:
+        message = f"dtype must be one of {sorted(DTYPES)}"
+    elif options.get('every_iteration') and options['iterations'] < 1:
+        message = "every_iteration needs at least one iteration"
+    else:
+        return None
+    return JSONResponse(
+        status_code=400,
+        content={
+            "status": "error",
+            "message": message
+        }
+    )
+
+def busy_response():
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        content={
+            "status": "error",
+            "message": "Server is busy, please retry shortly"
+        }
+    )
+
+async def read_upload(audio: UploadFile, **params):
+    # Hash the upload while reading it, so identical submissions can share one result
+    hasher = ContentHasher()
+    parts = []
+    while part := await audio.read(HASH_CHUNK_BYTES):
+        hasher.update(part)
+        parts.append(part)
+    return b"".join(parts), hasher.key(**params)
+
+async def compute_result(key, content, options: dict, progress=None):
+    # Decoding, the transform and plotting all run in a worker process
+    return await cache.get_or_compute(key, lambda: pool.run(
+        partial(process_upload, window_size=WINDOW_SIZE, progress=progress, **options),
+        content
+    ))
+
+def publish_result(result: dict, plot_format: str, cached: bool) -> dict:
+    # Keep the payloads server side; the client fetches them from the binary endpoints
+    items = {"audio": (result["audio"], "audio/wav")}
+    # Every iteration count but the last, which is the main audio
+    variants = result.get("variants", [])
+    for count, variant in enumerate(variants[:-1], start=1):
+        items[f"audio/{count}"] = (variant, "audio/wav")
+    if result["fullPlot"] is not None:
+        items["plot/full"] = (result["fullPlot"], PLOT_MEDIA_TYPES[plot_format])
+        items["plot/zoomed"] = (result["zoomedPlot"], PLOT_MEDIA_TYPES[plot_format])
+    result_id = results.put(items)
+
+    published = {
+        "id": result_id,
+        "audio": f"/results/{result_id}/audio",
+        "fullPlot": f"/results/{result_id}/plot/full" if "plot/full" in items else None,
+        "zoomedPlot": f"/results/{result_id}/plot/zoomed" if "plot/zoomed" in items else None,
+        "sampleRate": result["sampleRate"],
+        "duration": result["samples"] / result["sampleRate"],
+        "channels": result["channels"],
+        "expiresIn": results.ttl,
+        "cached": cached
+    }
+    if variants:
+        # Audio after 1, 2, ... iterations, for scrubbing between iteration counts
+        published["variants"] = [f"/results/{result_id}/audio/{count}" for count in range(1, len(variants))] + [
+            f"/results/{result_id}/audio"]
+    return published
+
 @app.post("/process-audio")
 async def process_audio(
     audio: UploadFile = File(...),
-    iterations: int = Form(4)  # Default to 4 iterations if not specified
+    iterations: int = Form(4),  # Default to 4 iterations if not specified
+    plot_format: str = Form('png'),  # 'json' returns peak envelopes for the client to draw
+    plot_dpi: int = Form(100),
+    mono: bool = Form(False),  # Channels are kept unless a downmix is asked for
+    native_rate: bool = Form(False),  # Process at the file's own sample rate instead of 44.1kHz
+    resample_quality: str = Form('high'),  # 'fast' trades some aliasing for quicker resampling
+    dtype: str = Form(DEFAULT_DTYPE),  # 'float64' for full precision at twice the memory
+    every_iteration: bool = Form(False)  # Also return the audio after each iteration count
 ):
     print("Processing audio file...")
-    # Create a temporary file to store the uploaded audio
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(audio.filename)[1]) as temp_file:
-        content = await audio.read()
-        temp_file.write(content)
-        temp_file_path = temp_file.name
+    options = dict(iterations=iterations, plot_format=plot_format, plot_dpi=plot_dpi, mono=mono,
+                   native_rate=native_rate, resample_quality=resample_quality, dtype=dtype,
+                   every_iteration=every_iteration)
+    error = invalid_options(options)
+    if error is not None:
+        return error
 
+    content, key = await read_upload(audio, transform='iterative_square', window=WINDOW_SIZE, **options)
     try:
-        # Load the audio file
-        signal, sr = load_audio_file(temp_file_path)
-        
-        # Process the audio using your main function
-        time, transformed_signals, full_plot_bytes, zoomed_plot_bytes = main(
-            signal,
-            sample_rate=sr,
-            window_size=10000,
-            plot_offset=0,
-            transformations=[
-                {
-                    'type': 'iterative',
-                    'function': square_wave_maker,
-                    'iterations': iterations
-                }
-            ]
-        )
-        
-        # Save the processed audio to a temporary file
-        output_path = tempfile.mktemp(suffix='.wav')
-        save_audio_file(transformed_signals[0], sr, output_path)
-
-        # Clean up input temp file
-        os.unlink(temp_file_path)
-
-        # Read the processed audio file into memory
-        with open(output_path, 'rb') as f:
-            audio_bytes = f.read()
-        
-        # Clean up output temp file
-        os.unlink(output_path)
-
-        # Convert audio and plots to base64
-        audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-        full_plot_b64 = base64.b64encode(full_plot_bytes).decode('utf-8')
-        zoomed_plot_b64 = base64.b64encode(zoomed_plot_bytes).decode('utf-8')
-
-        # Return JSON with audio and plot data
-        return JSONResponse({
-            "audio": f"data:audio/wav;base64,{audio_b64}",
-            "fullPlot": f"data:image/png;base64,{full_plot_b64}",
-            "zoomedPlot": f"data:image/png;base64,{zoomed_plot_b64}"
-        })
-        
+        result, cached = await compute_result(key, content, options)
+    except PoolSaturated:
+        return busy_response()
     except Exception as e:
-        # Clean up temporary files in case of error
-        if os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
         return JSONResponse(
             status_code=500,
             content={
@@ -94,6 +198,408 @@ async def process_audio(
             }
         )
 
+    try:
+        return JSONResponse(publish_result(result, plot_format, cached))
+    except ResultTooLarge as e:
+        return JSONResponse(
+            status_code=507,
+            content={
+                "status": "error",
+                "message": str(e)
+            }
+        )
+
+@app.post("/jobs")
+async def create_job(
+    audio: UploadFile = File(...),
+    iterations: int = Form(4),
+    plot_format: str = Form('png'),
+    plot_dpi: int = Form(100),
+    mono: bool = Form(False),
+    native_rate: bool = Form(False),
+    resample_quality: str = Form('high'),
+    dtype: str = Form(DEFAULT_DTYPE),
+    every_iteration: bool = Form(False)
+):
+    # Same work as /process-audio, but answered straight away; poll GET /jobs/{id} for
+    # progress and the result URLs once it is done
+    options = dict(iterations=iterations, plot_format=plot_format, plot_dpi=plot_dpi, mono=mono,
+                   native_rate=native_rate, resample_quality=resample_quality, dtype=dtype,
+                   every_iteration=every_iteration)
+    error = invalid_options(options)
+    if error is not None:
+        return error
+    if pool.saturated():
+        return busy_response()
+
+    content, key = await read_upload(audio, transform='iterative_square', window=WINDOW_SIZE, **options)
+    job = jobs.create()
+
+    async def run_job():
+        # A job for a key already being computed waits on that computation, and its own
+        # progress reporter never reaches a worker
+        if key in cache.pending:
+            if key in job_leaders:
+                jobs.follow(job.id, job_leaders[key])
+            else:
+                jobs.progress(job.id, 'waiting for identical job', 0.0)
+        else:
+            job_leaders[key] = job.id
+        try:
+            result, cached = await compute_result(key, content, options, progress=ProgressReporter(job.id))
+            jobs.finish(job.id, publish_result(result, plot_format, cached))
+        except PoolSaturated:
+            jobs.fail(job.id, "Server is busy, please retry shortly")
+        except Exception as e:
+            jobs.fail(job.id, str(e))
+        finally:
+            if job_leaders.get(key) == job.id:
+                del job_leaders[key]
+
+    task = asyncio.create_task(run_job())
+    job_tasks.add(task)
+    task.add_done_callback(job_tasks.discard)
+
+    return JSONResponse(
+        status_code=202,
+        headers={"Location": f"/jobs/{job.id}"},
+        content={**job.to_dict(), "url": f"/jobs/{job.id}"}
+    )
+
+class BatchTooLarge(Exception):
+    """Raised when a batch holds more than MAX_BATCH_BYTES of audio."""
+
+async def read_batch(files, archive):
+    # Returns (name, bytes) pairs from the uploaded files and the members of a zip archive
+    clips = []
+    size = 0
+    for upload in files or []:
+        clips.append((upload.filename or f"clip{len(clips)}", await upload.read()))
+        size += len(clips[-1][1])
+        if size > MAX_BATCH_BYTES:
+            raise BatchTooLarge()
+    if archive is not None:
+        # Decompressing is CPU bound, so it runs in a thread on the spooled upload
+        clips += await run_in_threadpool(extract_archive, archive.file, MAX_BATCH_BYTES - size)
+    return clips
+
+def extract_archive(file, max_bytes):
+    with zipfile.ZipFile(file) as bundle:
+        members = [member for member in bundle.infolist() if not member.is_dir()]
+        # Checked before anything is extracted; zipfile stops each member at its declared
+        # size, so a lying header cannot inflate past the limit either
+        if sum(member.file_size for member in members) > max_bytes:
+            raise BatchTooLarge()
+        return [(member.filename, bundle.read(member)) for member in members]
+
+def unique_stems(names):
+    # Archive entry names for each clip: the file name without its extension, made unique.
+    # Suffixes skip names already taken, including ones a later file has as its own stem.
+    stems, taken, counts = [], set(), {}
+    for name in names:
+        base = os.path.splitext(os.path.basename(name))[0] or "clip"
+        stem = base
+        while stem in taken:
+            counts[base] = counts.get(base, 0) + 1
+            stem = f"{base}_{counts[base]}"
+        taken.add(stem)
+        stems.append(stem)
+    return stems
+
+@app.post("/batch")
+async def process_batch_request(
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),  # A zip of audio files, instead of or alongside files
+    iterations: int = Form(4),
+    plots: bool = Form(False),
+    plot_format: str = Form('png'),
+    plot_dpi: int = Form(100),
+    mono: bool = Form(False),
+    native_rate: bool = Form(False),
+    resample_quality: str = Form('high'),
+    dtype: str = Form(DEFAULT_DTYPE),
+    output: str = Form('manifest')  # 'manifest' for result IDs, 'zip' for one archive of the results
+):
+    # Clips are split into a few groups per worker and each group runs as one pool task,
+    # so the cost of shipping work to a worker is paid per group rather than per clip
+    options = dict(iterations=iterations, plots=plots, plot_format=plot_format, plot_dpi=plot_dpi,
+                   mono=mono, native_rate=native_rate, resample_quality=resample_quality, dtype=dtype)
+    error = invalid_options(options)
+    if error is not None:
+        return error
+    if output not in ('manifest', 'zip'):
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "message": "output must be 'manifest' or 'zip'"
+            }
+        )
+    if pool.saturated():
+        return busy_response()
+
+    try:
+        clips = await read_batch(files, archive)
+    except zipfile.BadZipFile as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "message": f"Could not read archive: {str(e)}"
+            }
+        )
+    except BatchTooLarge:
+        return JSONResponse(
+            status_code=413,
+            content={
+                "status": "error",
+                "message": f"A batch may hold at most {MAX_BATCH_BYTES} bytes of audio"
+            }
+        )
+    if not clips or len(clips) > MAX_BATCH_FILES:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "message": f"A batch must hold between 1 and {MAX_BATCH_FILES} files"
+            }
+        )
+
+    group_size = -(-len(clips) // (4 * pool.workers))
+    groups = [clips[i:i + group_size] for i in range(0, len(clips), group_size)]
+    # One group per worker at a time leaves the admission queue to interactive requests
+    slots = asyncio.Semaphore(pool.workers)
+
+    async def run_group(group):
+        async with slots:
+            try:
+                return await pool.run(partial(process_batch, window_size=WINDOW_SIZE, **options),
+                                      [content for _, content in group])
+            except PoolSaturated:
+                return [{"error": "Server is busy, please retry shortly"}] * len(group)
+            except Exception as e:
+                return [{"error": str(e)}] * len(group)
+
+    outcomes = [outcome for group in await asyncio.gather(*map(run_group, groups)) for outcome in group]
+    names = [name for name, _ in clips]
+
+    if output == 'manifest':
+        manifest = []
+        for name, outcome in zip(names, outcomes):
+            if "error" in outcome:
+                manifest.append({"name": name, "status": "error", "message": outcome["error"]})
+            else:
+                try:
+                    manifest.append({"name": name, "status": "ok", **publish_result(outcome, plot_format, False)})
+                except ResultTooLarge as e:
+                    manifest.append({"name": name, "status": "error", "message": str(e)})
+        return JSONResponse({"results": manifest})
+
+    # Entries are stored, not deflated: PCM audio and PNGs barely compress
+    extension = 'png' if plot_format == 'png' else 'json'
+    buffer = io.BytesIO()
+    manifest = []
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as bundle:
+        for name, stem, outcome in zip(names, unique_stems(names), outcomes):
+            if "error" in outcome:
+                manifest.append({"name": name, "status": "error", "message": outcome["error"]})
+                continue
+            entry = {"name": name, "status": "ok", "audio": f"{stem}.wav",
+                     "sampleRate": outcome["sampleRate"], "channels": outcome["channels"],
+                     "duration": outcome["samples"] / outcome["sampleRate"]}
+            bundle.writestr(entry["audio"], outcome["audio"])
+            if outcome["fullPlot"] is not None:
+                entry["fullPlot"] = f"{stem}_full.{extension}"
+                entry["zoomedPlot"] = f"{stem}_zoomed.{extension}"
+                bundle.writestr(entry["fullPlot"], outcome["fullPlot"])
+                bundle.writestr(entry["zoomedPlot"], outcome["zoomedPlot"])
+            manifest.append(entry)
+        bundle.writestr("manifest.json", json.dumps({"results": manifest}, indent=2))
+
+    return Response(
+        buffer.getvalue(),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="synthfuzz-batch.zip"'}
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={
+                "status": "error",
+                "message": "Job not found or expired"
+            }
+        )
+    return JSONResponse(job.to_dict())
+
+def stored_response(request: Request, result_id: str, name: str, ranged: bool = False):
+    item = results.get(result_id, name)
+    if item is None:
+        return JSONResponse(
+            status_code=404,
+            content={
+                "status": "error",
+                "message": "Result not found or expired"
+            }
+        )
+
+    headers = {"ETag": item.etag, "Cache-Control": "private, max-age=%d" % results.ttl}
+    if ranged:
+        headers["Accept-Ranges"] = "bytes"
+    if request.headers.get("if-none-match") == item.etag:
+        return Response(status_code=304, headers=headers)
+
+    size = len(item.data)
+    range_header = request.headers.get("range") if ranged else None
+    # Single byte ranges only: "bytes=start-end", "bytes=start-" or "bytes=-suffix". Anything
+    # else, malformed or several ranges, is ignored and the whole item sent (RFC 9110 14.2)
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip()) if range_header is not None else None
+    if match is None or match.groups() == ('', '') or (
+            match.group(1) and match.group(2) and int(match.group(2)) < int(match.group(1))):
+        return Response(item.data, media_type=item.media_type, headers=headers)
+
+    if match.group(1) == '':
+        start, end = max(size - int(match.group(2)), 0), size - 1
+    else:
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    if start >= size or start > end:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(item.data[start:end + 1], status_code=206, media_type=item.media_type, headers=headers)
+
+@app.get("/results/{result_id}/audio")
+async def result_audio(request: Request, result_id: str):
+    return stored_response(request, result_id, "audio", ranged=True)
+
+@app.get("/results/{result_id}/audio/{iterations}")
+async def result_audio_variant(request: Request, result_id: str, iterations: int):
+    return stored_response(request, result_id, f"audio/{iterations}", ranged=True)
+
+@app.get("/results/{result_id}/plot/full")
+async def result_full_plot(request: Request, result_id: str):
+    return stored_response(request, result_id, "plot/full")
+
+@app.get("/results/{result_id}/plot/zoomed")
+async def result_zoomed_plot(request: Request, result_id: str):
+    return stored_response(request, result_id, "plot/zoomed")
+
+@app.get("/metrics")
+async def metrics():
+    # Queue depth, wait time and worker utilization, for sizing replicas
+    return JSONResponse({**pool.stats(), "resultStore": results.stats(), "cache": cache.stats(), "jobs": jobs.stats()})
+
+class AdmittedStream(StreamingResponse):
+    # Holds a pool admission slot until the response ends, whether it finished, failed or
+    # the client went away before the body was read
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            pool.release()
+
+@app.post("/process-audio/stream")
+async def process_audio_stream(
+    audio: UploadFile = File(...),
+    iterations: int = Form(4),
+    mono: bool = Form(False)
+):
+    # Decode, transform and encode chunk by chunk so audio reaches the client as it is
+    # produced. Decoding reads the spooled upload file in place; only one chunk is ever
+    # decoded. Streams run in the server's threads, so each holds a pool admission slot
+    # for as long as it is open, the same as a job running in a worker.
+    try:
+        pool.admit()
+    except PoolSaturated:
+        return busy_response()
+    chunks = read_audio_chunks(audio.file, target_sr=SAMPLE_RATE, mono=mono)
+    try:
+        # Opening the file and decoding the first chunk happen off the event loop;
+        # StreamingResponse iterates the rest in its threadpool
+        first_chunk = await run_in_threadpool(next, chunks, None)
+    except Exception as e:
+        pool.release()
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "message": f"Could not load audio file: {str(e)}"
+            }
+        )
+
+    def all_chunks():
+        if first_chunk is not None:
+            yield first_chunk
+            yield from chunks
+
+    channels = 1 if first_chunk is None or first_chunk.ndim == 1 else first_chunk.shape[0]
+
+    def wav_body():
+        yield wav_stream_header(SAMPLE_RATE, channels)
+        for processed in iterative_square_wave_stream(all_chunks(), WINDOW_SIZE, iterations):
+            yield encode_pcm16(processed)
+
+    return AdmittedStream(wav_body(), media_type="audio/wav")
+
+@app.websocket("/ws/process")
+async def process_audio_websocket(websocket: WebSocket):
+    # The client opens a session with a JSON message {"graph": "square", "window": 1500,
+    # "sampleRate": 44100}, then sends binary frames of little-endian float32 mono samples.
+    # Every frame is answered with the processed frame in the same format, followed by a
+    # JSON report of how long it took to process.
+    await websocket.accept()
+    try:
+        config = await websocket.receive_json()
+        window = int(config.get('window', 1500))
+        sample_rate = int(config.get('sampleRate', SAMPLE_RATE))
+    except (ValueError, TypeError, AttributeError) as e:
+        await websocket.send_json({"status": "error", "message": str(e)})
+        await websocket.close(code=1003)
+        return
+    if not 0 < sample_rate <= MAX_STREAM_SAMPLE_RATE or window > MAX_STREAM_WINDOW:
+        message = f"sampleRate must be between 1 and {MAX_STREAM_SAMPLE_RATE} and window at most {MAX_STREAM_WINDOW}"
+        await websocket.send_json({"status": "error", "message": message})
+        # 1008: policy violation
+        await websocket.close(code=1008, reason=message)
+        return
+    try:
+        session = StreamSession(graph=config.get('graph', 'square'), window=window, sample_rate=sample_rate)
+    except ValueError as e:
+        await websocket.send_json({"status": "error", "message": str(e)})
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.send_json({
+        "status": "ready",
+        "graph": session.graph,
+        "window": session.window,
+        "sampleRate": session.sample_rate
+    })
+
+    max_frame_bytes = int(MAX_FRAME_SECONDS * session.sample_rate) * 4
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None or len(data) % 4 != 0 or len(data) > max_frame_bytes:
+                await websocket.send_json({
+                    "status": "error",
+                    "message": f"Frames must be binary float32 samples, at most {MAX_FRAME_SECONDS}s long"
+                })
+                continue
+
+            output, report = await run_in_threadpool(session.process, np.frombuffer(data, dtype='<f4'))
+            await websocket.send_bytes(output.astype('<f4').tobytes())
+            await websocket.send_json(report)
+    except WebSocketDisconnect:
+        pass
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Per-request cost of each stage of the upload pipeline.
+
+Usage:
+    python benchmark.py [--seconds 30] [--repeat 5] [--stages decode,transform,plot,encode,search]
+    python benchmark.py --startup [--module api]
+
+Every case is run `repeat` times on a synthetic signal and the median wall time is reported,
+along with the peak memory numpy allocates during one more run.
+--startup instead reports what a cold process pays: the import cost of each module `module`
+pulls in, then each step of a worker's warm-up, both measured in fresh interpreters.
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import soundfile as sf
+
+from lib.utils import load_audio_file, save_audio_file
+from lib.square import square_wave_maker
+from lib.triangle import triangle_wave_maker
+from lib.iterative_application import iterative_shape_applier, combo_shape_applier
+from lib.combo_search import combo_search, beam_search
+
+WINDOW_SIZE = 10000
+
+
+def test_signal(seconds, sample_rate, channels=1):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    signal = np.stack([0.5 * np.sin(2 * np.pi * (220 + 110 * c) * t) + 0.01 * rng.standard_normal(len(t))
+                       for c in range(channels)])
+    return signal[0] if channels == 1 else signal
+
+
+def encoded(signal, sample_rate, format):
+    buffer = io.BytesIO()
+    sf.write(buffer, signal.T, sample_rate, format=format)
+    return buffer.getvalue()
+
+
+def timed(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def peak_memory(function):
+    # numpy reports its buffers to tracemalloc, so this covers every intermediate signal
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def decode_cases(seconds):
+    cases = []
+    for format in ['WAV', 'FLAC']:
+        for sample_rate in [44100, 48000]:
+            for channels in [1, 2]:
+                data = encoded(test_signal(seconds, sample_rate, channels), sample_rate, format)
+                name = f"decode {format} {sample_rate // 1000}k {'stereo' if channels == 2 else 'mono'}"
+                if sample_rate == 44100:
+                    cases.append((name, lambda data=data: load_audio_file(data, mono=False)))
+                else:
+                    for quality in ['fast', 'high']:
+                        cases.append((f"{name} -> 44.1k {quality}",
+                                      lambda data=data, quality=quality: load_audio_file(data, mono=False, quality=quality)))
+                    cases.append((f"{name} native", lambda data=data: load_audio_file(data, target_sr=None, mono=False)))
+    return cases
+
+
+def transform_cases(seconds):
+    cases = []
+    for dtype in ['float64', 'float32']:
+        signal = test_signal(seconds, 44100).astype(dtype)
+        cases.append((f"transform square x4 {dtype}",
+                      lambda signal=signal: iterative_shape_applier(square_wave_maker, signal, 4, WINDOW_SIZE)))
+    return cases
+
+
+def search_cases(seconds):
+    signal = test_signal(seconds, 44100).astype('float32')
+    functions = [square_wave_maker, triangle_wave_maker]
+
+    def from_scratch():
+        for length in range(1, 5):
+            for sequence in itertools.product(functions, repeat=length):
+                combo_shape_applier(list(sequence), signal, WINDOW_SIZE)
+
+    def shared_prefixes(prefixes=None):
+        # A prefix holds a partial sum and a residual; peak memory should fall with the budget
+        memory_bytes = None if prefixes is None else prefixes * 2 * signal.nbytes
+        for _ in combo_search(functions, signal, 4, WINDOW_SIZE, memory_bytes=memory_bytes):
+            pass
+
+    return [
+        ("combos up to 4, from scratch", from_scratch),
+        ("combos up to 4, shared prefixes", shared_prefixes),
+        ("combos up to 4, 2 prefixes cached", lambda: shared_prefixes(2)),
+        ("combos up to 4, 1 prefix cached", lambda: shared_prefixes(1)),
+        ("beam of 4 up to 8, 2 windows", lambda: beam_search(functions, signal, 8, [1000, WINDOW_SIZE])),
+    ]
+
+
+def plot_cases(seconds):
+    from main import main
+    signal = test_signal(seconds, 44100)
+    # main() runs one square-wave pass first; subtract the transform stage to isolate plotting
+    return [("main, 1 iteration + plots", lambda: main(
+        signal, window_size=WINDOW_SIZE,
+        transformations=[{'type': 'iterative', 'function': square_wave_maker, 'iterations': 1}]))]
+
+
+def encode_cases(seconds):
+    mono, stereo = test_signal(seconds, 44100), test_signal(seconds, 44100, 2)
+    return [
+        ("encode WAV mono", lambda: save_audio_file(mono, 44100)),
+        ("encode WAV stereo", lambda: save_audio_file(stereo, 44100)),
+    ]
+
+
+STAGES = {
+    'decode': decode_cases,
+    'transform': transform_cases,
+    'plot': plot_cases,
+    'encode': encode_cases,
+    'search': search_cases,
+}
+
+
+def fresh_interpreter(*args):
+    # Run in a new process from this directory so nothing is imported yet
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module):
+    # -X importtime writes "import time: self [us] | cumulative | name" to stderr, each import
+    # indented two spaces under the one that caused it and listed before it
+    total, times = 0.0, []
+    for line in fresh_interpreter('-X', 'importtime', '-c', f'import {module}').stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0 and name.strip() == module:
+            total = int(cumulative) / 1e6
+        elif depth == 1:
+            times.append((name.strip(), int(cumulative) / 1e6))
+    return total, times
+
+
+def startup(module, top=15):
+    total, times = import_times(module)
+    print(f"import {module}: {total:.2f}s, slowest imports it makes")
+    for name, seconds in sorted(times, key=lambda item: -item[1])[:top]:
+        print(f"  {name:<40} {1000 * seconds:9.1f} ms")
+
+    # main() prints while it runs, so the timings are the last line of output
+    output = fresh_interpreter('-c', 'import json; from pipeline import warm_up; print(json.dumps(warm_up()))')
+    timings = json.loads(output.stdout.splitlines()[-1])
+    print(f"worker warm-up: {sum(timings.values()):.2f}s")
+    for name, seconds in timings.items():
+        print(f"  {name:<40} {1000 * seconds:9.1f} ms")
+
+
+def run(stages, seconds, repeat):
+    print(f"{seconds:g}s of audio, median of {repeat} runs")
+    for stage in stages:
+        for name, function in STAGES[stage](seconds):
+            print(f"  {name:<40} {1000 * timed(function, repeat):9.1f} ms {peak_memory(function) / 1e6:9.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--startup', action='store_true', help='report cold-start cost instead')
+    parser.add_argument('--module', default='api', help='module to import for --startup')
+    args = parser.parse_args()
+    if args.startup:
+        startup(args.module)
+    else:
+        run(args.stages.split(','), args.seconds, args.repeat)
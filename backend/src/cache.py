@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+HASH_CHUNK_BYTES = 1 << 20
+logger = logging.getLogger(__name__)
+
+
+class ContentHasher:
+    """
+    Streaming content hash of an upload plus the parameters it is processed with.
+
+    Feed the raw bytes with update() as they arrive, then call key() with the parameters.
+    """
+
+    def __init__(self):
+        self.hasher = hashlib.blake2b(digest_size=20)
+
+    def update(self, data: bytes):
+        self.hasher.update(data)
+
+    def key(self, **params) -> str:
+        hasher = self.hasher.copy()
+        hasher.update(json.dumps(params, sort_keys=True).encode())
+        return hasher.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier LRU cache of finished results, with concurrent identical requests collapsed.
+
+    Hot results live in memory; everything that is cached is also written to a size-capped
+    directory on disk, which is scanned lazily on first use so it survives restarts. Both
+    tiers evict least recently used entries first.
+
+    Args:
+        memory_bytes (int): Memory tier cap (default: SYNTHFUZZ_CACHE_MEMORY_BYTES or 256MB)
+        disk_bytes (int): Disk tier cap, 0 disables it (default: SYNTHFUZZ_CACHE_DISK_BYTES or 2GB)
+        directory (str): Disk tier location (default: SYNTHFUZZ_CACHE_DIR or ./result_cache)
+    """
+
+    def __init__(self, memory_bytes: int = None, disk_bytes: int = None, directory: str = None):
+        self.memory_bytes = memory_bytes if memory_bytes is not None else int(
+            os.environ.get('SYNTHFUZZ_CACHE_MEMORY_BYTES', 256 * 1024 * 1024))
+        self.disk_bytes = disk_bytes if disk_bytes is not None else int(
+            os.environ.get('SYNTHFUZZ_CACHE_DISK_BYTES', 2 * 1024 * 1024 * 1024))
+        self.directory = directory or os.environ.get('SYNTHFUZZ_CACHE_DIR', './result_cache')
+
+        self.memory = OrderedDict()  # key -> (size, value)
+        self.memory_total = 0
+        self.disk = None  # key -> size, filled from the directory on first use
+        self.disk_total = 0
+        self.lock = threading.Lock()
+        self.pending = {}  # key -> Future shared by every request waiting on that key
+        self.writes = set()  # Disk writes still running, referenced until they finish
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.collapsed = 0
+
+    async def get_or_compute(self, key: str, compute):
+        """
+        Return the cached value for key, or await compute() once and cache its result.
+
+        Requests for a key that is already being computed wait for that computation instead
+        of starting their own. Failures are passed on to every waiter and are not cached.
+
+        Returns:
+            Tuple[Any, bool]: (value, whether it came from the cache)
+        """
+        value = self.memory_get(key)
+        if value is not None:
+            self.hits += 1
+            return value, True
+
+        if key in self.pending:
+            self.collapsed += 1
+            return await asyncio.shield(self.pending[key]), True
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        try:
+            value = await asyncio.get_running_loop().run_in_executor(None, self.disk_get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory_put(key, value)
+                cached = True
+            else:
+                self.misses += 1
+                value = await compute()
+                self.memory_put(key, value)
+                # Written in the background; nobody waits for the disk tier
+                write = asyncio.get_running_loop().run_in_executor(None, self.disk_put, key, value)
+                self.writes.add(write)
+                write.add_done_callback(self.write_done)
+                cached = False
+            future.set_result(value)
+            return value, cached
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self.pending[key]
+
+    def write_done(self, write):
+        self.writes.discard(write)
+        if not write.cancelled() and write.exception() is not None:
+            logger.error("Writing a result to the disk cache failed", exc_info=write.exception())
+
+    def memory_get(self, key):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is None:
+                return None
+            self.memory.move_to_end(key)
+            return entry[1]
+
+    def memory_put(self, key, value):
+        size = result_size(value)
+        with self.lock:
+            if key in self.memory:
+                self.memory_total -= self.memory.pop(key)[0]
+            # A value over the cap would evict everything else and then itself
+            if size > self.memory_bytes:
+                return
+            self.memory[key] = (size, value)
+            self.memory_total += size
+            while self.memory_total > self.memory_bytes and self.memory:
+                self.memory_total -= self.memory.popitem(last=False)[1][0]
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def load_disk_index(self):
+        # Called with the lock held; oldest access time first
+        if self.disk is not None:
+            return
+        self.disk = OrderedDict()
+        if not os.path.isdir(self.directory):
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_total += size
+
+    def disk_get(self, key):
+        if self.disk_bytes <= 0:
+            return None
+        with self.lock:
+            self.load_disk_index()
+            if key not in self.disk:
+                return None
+            self.disk.move_to_end(key)
+        try:
+            with open(self.path(key), 'rb') as f:
+                value = pickle.load(f)
+            os.utime(self.path(key))
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self.lock:
+                if key in self.disk:
+                    self.disk_total -= self.disk.pop(key)
+            return None
+
+    def disk_put(self, key, value):
+        if self.disk_bytes <= 0:
+            return
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.disk_bytes:
+            return
+        # Write under a temporary name so a crash never leaves a truncated entry behind
+        temporary = self.path(key) + '.%d.tmp' % threading.get_ident()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, self.path(key))
+        except OSError:
+            # A full or read-only disk only costs the disk tier, never the request
+            return
+
+        with self.lock:
+            self.load_disk_index()
+            if key in self.disk:
+                self.disk_total -= self.disk.pop(key)
+            self.disk[key] = len(data)
+            self.disk_total += len(data)
+            evicted = []
+            while self.disk_total > self.disk_bytes and self.disk:
+                old_key, old_size = self.disk.popitem(last=False)
+                self.disk_total -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.unlink(self.path(old_key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "collapsed": self.collapsed,
+                "pending": len(self.pending),
+                "memoryEntries": len(self.memory),
+                "memoryBytes": self.memory_total,
+                "diskEntries": len(self.disk) if self.disk is not None else None,
+                "diskBytes": self.disk_total if self.disk is not None else None
+            }
+
+
+def result_size(value) -> int:
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(result_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(result_size(item) for item in value)
+    return 64
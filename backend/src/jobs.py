@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class Job:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.state = 'queued'  # queued, running, done or failed
+        self.stage = 'queued'
+        self.percent = 0.0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.updated = self.created
+
+    def to_dict(self) -> dict:
+        status = {
+            "id": self.id,
+            "state": self.state,
+            "stage": self.stage,
+            "percent": round(self.percent, 1),
+            "createdAt": self.created,
+            "updatedAt": self.updated
+        }
+        if self.result is not None:
+            status["result"] = self.result
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+
+class JobStore:
+    """
+    Tracks background jobs and their progress until they are collected.
+
+    Progress updates may arrive from any thread. Finished jobs are kept for a TTL so clients
+    can poll for the result, and the oldest finished jobs are dropped beyond `max_jobs`.
+    Queued and running jobs are never dropped; admission to the pool bounds how many there are.
+
+    Args:
+        ttl (float): Seconds a finished job is kept (default: SYNTHFUZZ_JOB_TTL or 600)
+        max_jobs (int): Most jobs kept at once (default: SYNTHFUZZ_MAX_JOBS or 1000)
+    """
+
+    def __init__(self, ttl: float = None, max_jobs: int = None):
+        self.ttl = ttl if ttl is not None else float(os.environ.get('SYNTHFUZZ_JOB_TTL', 600))
+        self.max_jobs = max_jobs or int(os.environ.get('SYNTHFUZZ_MAX_JOBS', 1000))
+        self.jobs = OrderedDict()
+        self.followers = {}  # job id -> ids of jobs waiting on the same computation
+        self.lock = threading.Lock()
+
+    def create(self) -> Job:
+        job = Job(uuid.uuid4().hex)
+        with self.lock:
+            self.jobs[job.id] = job
+            self.evict()
+        return job
+
+    def get(self, job_id: str):
+        with self.lock:
+            self.evict()
+            return self.jobs.get(job_id)
+
+    def follow(self, job_id: str, leader_id: str):
+        """
+        Mirror the progress of `leader_id` to `job_id`, a job collapsed onto the same
+        computation; only the leader's progress reaches the worker.
+        """
+        with self.lock:
+            leader = self.jobs.get(leader_id)
+            if leader is None or leader.state in ('done', 'failed'):
+                return
+            self.followers.setdefault(leader_id, []).append(job_id)
+            if leader.state == 'running':
+                self.update(job_id, leader.stage, leader.percent)
+
+    def progress(self, job_id: str, stage: str, percent: float):
+        with self.lock:
+            for target in [job_id, *self.followers.get(job_id, [])]:
+                self.update(target, stage, percent)
+
+    def update(self, job_id, stage, percent):
+        job = self.jobs.get(job_id)
+        # Late updates from a worker must not reopen a finished job
+        if job is None or job.state in ('done', 'failed'):
+            return
+        job.state = 'running'
+        job.stage = stage
+        job.percent = max(job.percent, percent)
+        job.updated = time.time()
+
+    def finish(self, job_id: str, result: dict):
+        self.close(job_id, 'done', result=result)
+
+    def fail(self, job_id: str, error: str):
+        self.close(job_id, 'failed', error=error)
+
+    def close(self, job_id, state, result=None, error=None):
+        with self.lock:
+            # Followers are closed by their own requests once the shared result arrives
+            self.followers.pop(job_id, None)
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job.state = job.stage = state
+            job.result = result
+            job.error = error
+            if state == 'done':
+                job.percent = 100.0
+            job.updated = time.time()
+
+    def evict(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.state in ('done', 'failed') and now - job.updated > self.ttl]
+        for job_id in expired:
+            del self.jobs[job_id]
+        excess = len(self.jobs) - self.max_jobs
+        if excess > 0:
+            finished = [job_id for job_id, job in self.jobs.items() if job.state in ('done', 'failed')]
+            for job_id in finished[:excess]:
+                del self.jobs[job_id]
+
+    def stats(self) -> dict:
+        with self.lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return states
@@ -0,0 +1,174 @@
+import numpy as np
+from lib.utils import float_dtype
+
+# Samples per frame of the spectra compared by SpectralError
+SPECTRUM_FRAME = 2048
+
+
+def combo_search(functions, audio, max_length, *args, memory_bytes=None, **kwargs):
+    """
+    Run combo_shape_applier on every sequence of `functions` up to `max_length` long.
+
+    Sequences are visited depth first, and the partial sum and residual of each prefix are
+    kept while its children are evaluated, so every distinct prefix costs one shape call:
+    m + m^2 + ... + m^k calls in all, rather than one per step of every sequence.
+
+    Args:
+        functions (list): Shape functions, each called as function(residual, *args, **kwargs)
+        audio (np.ndarray): Input signal, mono or (channels, samples)
+        max_length (int): Longest sequence to try
+        memory_bytes (int, optional): Most memory to spend on cached prefixes. When the path
+            being searched needs more, a prefix is dropped while its subtree is searched and
+            replayed from the nearest cached one before its next child (default: no limit)
+
+    Yields:
+        Tuple[tuple, np.ndarray, np.ndarray]: (sequence, total signal, residual) for every
+        sequence, the total signal being what combo_shape_applier(sequence, audio, ...)
+        returns and the residual what is left of the audio. The arrays are read-only, since
+        longer sequences carry on from them.
+    """
+    audio = np.asarray(audio, dtype=float_dtype(audio))
+    root = (np.zeros(audio.shape, dtype=audio.dtype), audio)
+    # A prefix holds its partial sum and its residual
+    prefix_bytes = 2 * audio.nbytes
+    if memory_bytes is None or prefix_bytes == 0:
+        capacity = max_length
+    else:
+        capacity = max(int(memory_bytes // prefix_bytes), 1)
+
+    # states[d] is the state after the first d functions of the sequence being searched, or
+    # None while dropped; this list holds the only reference, so dropping frees the memory
+    states = [root]
+
+    def replay(sequence):
+        depth = max(d for d, state in enumerate(states) if state is not None)
+        state = states[depth]
+        for function in sequence[depth:]:
+            state = apply_step(state, function, *args, **kwargs)
+        return state
+
+    def search(sequence):
+        depth = len(sequence)
+        for function in functions:
+            if states[depth] is None:
+                states[depth] = replay(sequence)
+            child = apply_step(states[depth], function, *args, **kwargs)
+            longer = sequence + (function,)
+            yield (longer, *child)
+            if len(longer) < max_length:
+                if sum(state is not None for state in states[1:]) + 1 > capacity:
+                    states[depth] = None
+                states.append(child)
+                del child
+                yield from search(longer)
+                states.pop()
+
+    if max_length > 0:
+        yield from search(())
+
+
+def beam_search(functions, audio, max_length, windows, beam_width=4, score='rms', n_jobs=-1):
+    """
+    Search sequences of (shape function, window) steps for the ones that best fit the audio.
+
+    Each depth extends the `beam_width` best sequences so far by every function at every
+    window, scores the candidates, and keeps the best `beam_width` of them for the next
+    depth. A step runs like one step of combo_shape_applier, on the residual the sequence
+    has left. Candidates of a depth are evaluated in parallel threads; the shape functions
+    spend their time in numpy, which releases the GIL.
+
+    Args:
+        functions (list): Shape functions, each called as function(residual, window)
+        audio (np.ndarray): Input signal, mono or (channels, samples)
+        max_length (int): Longest sequence to build
+        windows (list): Window sizes to try every function at
+        beam_width (int): Sequences kept at each depth (default: 4)
+        score (str | callable): Lower is better. 'rms' for the RMS of the residual,
+            'spectral' for SpectralError against the input, or score(total, residual)
+            (default: 'rms')
+        n_jobs (int): Parallel jobs, as for joblib; -1 uses every core (default: -1)
+
+    Returns:
+        list: The `beam_width` best sequences seen at any depth, best first, each as
+        (score, sequence, total signal), the sequence being a tuple of (function, window)
+    """
+    from joblib import Parallel, delayed
+
+    audio = np.asarray(audio, dtype=float_dtype(audio))
+    if isinstance(score, str):
+        if score not in SCORES:
+            raise ValueError(f"score must be one of {sorted(SCORES)} or a callable")
+        score = SCORES[score](audio)
+    steps = [(function, window) for function in functions for window in windows]
+
+    beam = [((), (np.zeros(audio.shape, dtype=audio.dtype), audio))]
+    best = []
+    with Parallel(n_jobs=n_jobs, prefer='threads', return_as='generator') as parallel:
+        for _ in range(max_length):
+            candidates = [(sequence + (step,), state) for sequence, state in beam for step in steps]
+            ranked = best_candidates(zip(candidates, parallel(
+                delayed(evaluate_step)(state, *sequence[-1], score) for sequence, state in candidates)), beam_width)
+            beam = [(sequence, state) for _, sequence, state in ranked]
+            best = sorted(best + [(value, sequence, state[0]) for value, sequence, state in ranked],
+                          key=lambda item: item[0])[:beam_width]
+    return best
+
+
+def apply_step(state, function, *args, **kwargs):
+    # One step of combo_shape_applier on a (total, residual) state; the new state is
+    # read-only since longer sequences carry on from it
+    total, residual = state
+    new_signal = function(residual, *args, **kwargs)
+    total, residual = total + new_signal, residual - new_signal
+    total.flags.writeable = residual.flags.writeable = False
+    return total, residual
+
+
+def evaluate_step(state, function, window, score):
+    state = apply_step(state, function, window)
+    return score(*state), state
+
+
+def best_candidates(results, count):
+    # Results stream in, so only the states of the best few candidates are ever held
+    ranked = []
+    for (sequence, _), (value, state) in results:
+        ranked = sorted(ranked + [(value, sequence, state)], key=lambda item: item[0])[:count]
+    return ranked
+
+
+def residual_rms(total, residual):
+    return float(np.sqrt(np.mean(np.square(residual), dtype=np.float64)))
+
+
+def stft_magnitude(signal, frame=SPECTRUM_FRAME):
+    # Hann-windowed frames with 50% overlap along the last axis; short signals are padded
+    signal = np.asarray(signal)
+    if signal.shape[-1] < frame:
+        pad = [(0, 0)] * (signal.ndim - 1) + [(0, frame - signal.shape[-1])]
+        signal = np.pad(signal, pad)
+    frames = np.lib.stride_tricks.sliding_window_view(signal, frame, axis=-1)[..., ::frame // 2, :]
+    return np.abs(np.fft.rfft(frames * np.hanning(frame).astype(signal.dtype), axis=-1))
+
+
+class SpectralError:
+    """
+    Spectral convergence of an approximation to `audio`: the norm of the difference between
+    their STFT magnitudes, relative to the norm of the input's. The input's spectrum is
+    computed once, so scoring a candidate costs one STFT.
+    """
+
+    def __init__(self, audio, frame=SPECTRUM_FRAME):
+        self.frame = frame
+        self.reference = stft_magnitude(audio, frame)
+        self.norm = max(float(np.linalg.norm(self.reference)), np.finfo(np.float32).tiny)
+
+    def __call__(self, total, residual):
+        return float(np.linalg.norm(stft_magnitude(total, self.frame) - self.reference)) / self.norm
+
+
+# Score names for beam_search, each building a score(total, residual) for the input audio
+SCORES = {
+    'rms': lambda audio: residual_rms,
+    'spectral': SpectralError,
+}
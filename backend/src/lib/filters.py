@@ -0,0 +1,30 @@
+import numpy as np
+
+
+def dc_block(signal, alpha=0.995, prev_x=0.0, prev_y=0.0):
+    """
+    One-pole DC blocker y[i] = x[i] - x[i-1] + alpha * y[i-1], run as an IIR filter.
+
+    Args:
+        signal (np.ndarray): Block of samples to filter, time along the last axis
+        alpha (float): Pole position (default: 0.995)
+        prev_x (float | np.ndarray): Last input sample of the previous block, per channel
+        prev_y (float | np.ndarray): Last output sample of the previous block, per channel
+
+    Returns:
+        Tuple[np.ndarray, float, float]: (filtered block, new prev_x, new prev_y); the state
+        is an array with one entry per channel for multichannel blocks
+
+    Feeding the returned state into the next call continues the recursion exactly,
+    so a signal can be filtered in blocks of any size.
+    """
+    # scipy.signal is slow to import, so it is only loaded once a block is filtered
+    from scipy.signal import lfilter
+    x = np.asarray(signal, dtype=np.float64)
+    if x.shape[-1] == 0:
+        return x, prev_x, prev_y
+    zi = np.broadcast_to(alpha * np.asarray(prev_y) - np.asarray(prev_x), x.shape[:-1])[..., None]
+    y, _ = lfilter([1.0, -1.0], [1.0, -alpha], x, axis=-1, zi=zi)
+    if x.ndim == 1:
+        return y, float(x[-1]), float(y[-1])
+    return y, x[..., -1], y[..., -1]
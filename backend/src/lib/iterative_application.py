@@ -1,31 +1,68 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.integrate import cumulative_trapezoid as cumtrapz
-from functools import partial
-from joblib import Memory
-from tqdm import tqdm
-import copy
+import inspect
 from lib.utils import *
 
 
-memory = Memory("./cache_dir", verbose=0)  # Cache directory
+def iterative_shape_applier(function, audio, iterations, *args, progress=None, **kwargs):
+    total_signal = np.zeros(np.shape(audio), dtype=float_dtype(audio))
+    for total_signal, _, _ in iterative_shape_steps(function, audio, iterations, *args, progress=progress, **kwargs):
+        pass
+    return total_signal
+
+
+def iterative_shape_steps(function, audio, iterations, *args, progress=None, **kwargs):
+    """
+    Run iterative_shape_applier one iteration at a time, yielding the state after each.
+
+    Args:
+        function (callable): Shape function, called as function(residual, *args, **kwargs)
+        audio (np.ndarray): Input signal, mono or (channels, samples)
+        iterations (int): Number of iterations
+        progress (callable, optional): Called as progress(done, total) as iterations advance
 
+    Yields:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (cumulative, component, residual) after each
+        iteration. cumulative is what iterative_shape_applier returns for that many iterations,
+        component what the iteration added, and residual what is left for the next one.
 
-def iterative_shape_applier(function, audio, iterations, *args, **kwargs):
-    total_signal = np.zeros(len(audio))
+    Every iteration count up to `iterations` comes out of the one run, so asking for all of
+    them costs no more than asking for the last.
+    """
+    total_signal = np.zeros(np.shape(audio), dtype=float_dtype(audio))
     for i in range(iterations):
-        new_signal = function(audio, *args, **kwargs)
-        total_signal += new_signal
+        if progress is not None:
+            progress(i, iterations)
+        new_signal = function(audio, *args, **step_progress(function, progress, i, iterations), **kwargs)
+        # A new array each time, since earlier states are handed out
+        total_signal = total_signal + new_signal
         audio = audio - new_signal
-    return total_signal
+        yield total_signal, new_signal, audio
+    if progress is not None:
+        progress(iterations, iterations)
 
 
-def combo_shape_applier(functions, audio, *args, **kwargs):
-    total_signal = np.zeros(len(audio))
+def combo_shape_applier(functions, audio, *args, progress=None, **kwargs):
+    total_signal = np.zeros(np.shape(audio), dtype=float_dtype(audio))
     for i, function in enumerate(functions):
-        new_signal = function(audio, *args, **kwargs)
+        if progress is not None:
+            progress(i, len(functions))
+        new_signal = function(audio, *args, **step_progress(function, progress, i, len(functions)), **kwargs)
         total_signal += new_signal
         audio = audio - new_signal
+    if progress is not None:
+        progress(len(functions), len(functions))
     return total_signal
 
 
+def step_progress(function, progress, step, steps):
+    # Functions that report their own progress(done, total) get it folded into this step
+    if progress is None or not accepts_progress(function):
+        return {}
+    return {'progress': lambda done, total: progress(step + done / max(total, 1), steps)}
+
+
+def accepts_progress(function):
+    try:
+        return 'progress' in inspect.signature(function).parameters
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class PeakPyramid:
+    """
+    Min/max decimation pyramid of a signal, for drawing waveforms of any range cheaply.
+
+    Level 0 holds the minimum and maximum of every `base` samples, and each level above it
+    combines `factor` blocks of the level below. Building it is O(n); reading an envelope
+    touches at most a few blocks per output column.
+
+    A (channels, samples) signal gets one joint envelope covering all of its channels.
+
+    Args:
+        signal (np.ndarray): Signal to summarise
+        base (int): Samples per block at level 0 (default: 16)
+        factor (int): Blocks combined per level (default: 4)
+    """
+
+    def __init__(self, signal, base=16, factor=4):
+        self.signal = np.asarray(signal)
+        self.length = self.signal.shape[-1]
+        self.frames = self.signal.reshape(int(np.prod(self.signal.shape[:-1])), self.length)
+        self.base = base
+        self.factor = factor
+        self.levels = []  # (block size, mins, maxs)
+
+        if self.length == 0:
+            # Nothing to summarise; every envelope of an empty signal is empty
+            empty = np.zeros(0, dtype=self.signal.dtype)
+            self.levels.append((base, empty, empty))
+            return
+        mins, maxs = block_extrema(self.frames, self.frames, base)
+        block, mins, maxs = base, mins.min(axis=0), maxs.max(axis=0)
+        while len(mins) > 1:
+            self.levels.append((block, mins, maxs))
+            block, mins, maxs = block * factor, *block_extrema(mins, maxs, factor)
+        self.levels.append((block, mins, maxs))
+
+    def envelope(self, start, end, columns):
+        """
+        Minimum and maximum of signal[start:end] split into `columns` equal spans.
+
+        When a span would hold fewer than two samples the raw samples are returned instead,
+        as both mins and maxs (or, for several channels, their per-sample extremes).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (first sample index of each span, mins, maxs)
+        """
+        start, end = max(start, 0), min(end, self.length)
+        if end <= start:
+            empty = np.zeros(0)
+            return empty.astype(int), empty, empty
+        if (end - start) < 2 * columns:
+            samples = self.frames[:, start:end]
+            if len(samples) == 1:
+                return np.arange(start, end), samples[0], samples[0]
+            return np.arange(start, end), samples.min(axis=0), samples.max(axis=0)
+
+        # Coarsest level whose blocks still fit at least once into every span
+        per_column = (end - start) / columns
+        block, mins, maxs = None, None, None
+        for level_block, level_mins, level_maxs in self.levels:
+            if level_block > per_column:
+                break
+            block, mins, maxs = level_block, level_mins, level_maxs
+
+        edges = start + (np.arange(columns + 1) * (end - start)) // columns
+        if block is None:
+            span_mins, span_maxs = block_extrema(self.frames[:, start:end], self.frames[:, start:end],
+                                                 indices=edges[:-1] - start)
+            return edges[:-1], span_mins.min(axis=0), span_maxs.max(axis=0)
+
+        # Spans are widened to whole blocks: each takes the blocks from the one holding its
+        # first sample up to the one holding its last, so neighbouring spans may share a block
+        first, last = start // block, -(-end // block)
+        mins, maxs = mins[first:last], maxs[first:last]
+        indices = edges[:-1] // block - first
+        span_mins = np.minimum.reduceat(mins, indices)
+        span_maxs = np.maximum.reduceat(maxs, indices)
+
+        straddles = edges[1:-1] % block != 0
+        span_mins[:-1] = np.where(straddles, np.minimum(span_mins[:-1], mins[indices[1:]]), span_mins[:-1])
+        span_maxs[:-1] = np.where(straddles, np.maximum(span_maxs[:-1], maxs[indices[1:]]), span_maxs[:-1])
+        return edges[:-1], span_mins, span_maxs
+
+
+def block_extrema(mins, maxs, block=None, indices=None):
+    # Reduce consecutive groups of `block` entries along the last axis, or the groups
+    # starting at `indices`; the last group may be short
+    if indices is None:
+        indices = np.arange(0, mins.shape[-1], block)
+    return np.minimum.reduceat(mins, indices, axis=-1), np.maximum.reduceat(maxs, indices, axis=-1)
+
+
+def envelope_json(pyramid, start, end, columns, digits=4):
+    """
+    Compact JSON-ready envelope of a pyramid, with values rounded to `digits` decimals.
+
+    Point i covers samples from start + i * samplesPerPoint onwards.
+    """
+    positions, mins, maxs = pyramid.envelope(start, end, columns)
+    return {
+        "start": int(positions[0]) if len(positions) else start,
+        "samplesPerPoint": (min(end, pyramid.length) - max(start, 0)) / max(len(positions), 1),
+        "min": np.round(mins.astype(float), digits).tolist(),
+        "max": np.round(maxs.astype(float), digits).tolist()
+    }
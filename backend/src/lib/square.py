@@ -1,14 +1,6 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.integrate import cumulative_trapezoid as cumtrapz
-from functools import partial
-from joblib import Memory
-from tqdm import tqdm
-import copy
 from lib.utils import *
 
-memory = Memory("./cache_dir", verbose=0)  # Cache directory
-
 
 def square_wave_maker(audio, window):
     
@@ -18,3 +10,36 @@ def square_wave_maker(audio, window):
     return sign * root_mean_squared
 
 
+
+def iterative_square_wave_stream(chunks, window, iterations):
+    """
+    Run iterative_shape_applier(square_wave_maker, ...) over consecutive chunks of one signal.
+
+    Args:
+        chunks (Iterable[np.ndarray]): Consecutive pieces of the input signal, mono or
+            (channels, samples)
+        window (int): Window size for the sliding RMS
+        iterations (int): Number of square-wave passes
+
+    Yields:
+        np.ndarray: The transformed signal for each chunk, in order
+
+    Each pass keeps the last window-1 samples of its residual, so every chunk sees exactly
+    the windows (growing warmup included) it would have seen in a single offline call.
+    Chunks of at least `window` samples keep the recomputed history cheap.
+    """
+    histories = None
+    for chunk in chunks:
+        audio = np.asarray(chunk, dtype=float_dtype(chunk))
+        if histories is None:
+            histories = [audio[..., :0] for _ in range(iterations)]
+        total_signal = np.zeros(audio.shape, dtype=audio.dtype)
+        for i in range(iterations):
+            kept = histories[i].shape[-1]
+            extended = np.concatenate([histories[i], audio], axis=-1)
+            root_mean_squared = apply_sliding_window_efficient(extended, window, rms)[..., kept:]
+            new_signal = np.sign(audio) * root_mean_squared
+            histories[i] = extended[..., max(extended.shape[-1] - (window - 1), 0):] if window > 1 else extended[..., :0]
+            total_signal += new_signal
+            audio = audio - new_signal
+        yield total_signal
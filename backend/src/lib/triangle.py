@@ -1,53 +1,56 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.integrate import cumulative_trapezoid as cumtrapz
-from functools import partial
-from joblib import Memory
-from tqdm import tqdm
-import copy
 from lib.utils import *
 
-memory = Memory("./cache_dir", verbose=0)  # Cache directory
 
-def old_triangle_wave_maker(audio, window):
+PROGRESS_INTERVAL = 1 << 16
 
+def old_triangle_wave_maker(audio, window, progress=None):
+
+    audio = np.asarray(audio, dtype=float_dtype(audio))
+    if audio.ndim > 1:
+        # The loop is sequential in time, so channels take turns
+        channels = audio.reshape(-1, audio.shape[-1])
+        return np.stack([
+            old_triangle_wave_maker(channel, window, None if progress is None else
+                                    lambda done, total, c=c: progress(c * total + done, len(channels) * total))
+            for c, channel in enumerate(channels)]).reshape(audio.shape)
+
+    n = len(audio)
     deriv_audio = derivative(audio)
     root_mean_squared = apply_sliding_window_efficient(audio, window, rms)
-    mean_pos = apply_sliding_window_efficient(audio, window, mean_positive, zero_fill=True)
-    mean_neg = apply_sliding_window_efficient(audio, window, mean_negative, zero_fill=True)
 
-    # init_slope = apply_sliding_window_efficient(deriv_audio, window, abs_mean)
-    # mean_slope = apply_sliding_window_efficient(deriv_audio, window, np.mean)
+    # The direction feeds back through the displacement from the output, so this stays a
+    # scalar loop, but over plain floats with an O(1) update of the windowed crossover count
+    slope_scale = root_mean_squared * 2 * (3**.5) / np.maximum(np.minimum(window, np.arange(n)), 1)
+    audio_values = audio.tolist()
+    deriv_values = deriv_audio.tolist()
+    slope_values = slope_scale.tolist()
 
-    crossovers = []
+    crossovers = [0] * n
     total_crossovers = 1
 
-    
-    new_audio = [0]
+    new_audio = [0.0] * n
     direction = 1
-    sign = np.sign(deriv_audio)
 
-    for i in range(1, len(audio)):
-        displacement = audio[i-1] - new_audio[i-1]
-        coinciding = direction * deriv_audio[i-1] > 0
+    for i in range(1, n):
+        displacement = audio_values[i-1] - new_audio[i-1]
+        coinciding = direction * deriv_values[i-1] > 0
         wrong_way = displacement * direction <= 0
 
         if (not coinciding) and wrong_way:
             direction *= -1
-            crossovers.append(1)
+            crossovers[i] = 1
             total_crossovers += 1
-        else:
-            crossovers.append(0)
-
-        if len(crossovers) > window:
-            total_crossovers -= crossovers.pop(0)
-
-        # slope = mean_pos[i] if direction == 1 else mean_neg[i]
-        slope = root_mean_squared[i] * 2 * (3**.5) * total_crossovers / min(window, i)
-        
-        new_audio.append(new_audio[-1] + (direction * slope))
-    
-    new_audio = np.array(new_audio)
+
+        if i > window:
+            total_crossovers -= crossovers[i - window]
+
+        new_audio[i] = new_audio[i-1] + direction * slope_values[i] * total_crossovers
+
+        if progress is not None and i % PROGRESS_INTERVAL == 0:
+            progress(i, n)
+
+    new_audio = np.array(new_audio, dtype=audio.dtype)
     new_audio_rms = apply_sliding_window_efficient(new_audio, window, rms)
     scale = (root_mean_squared / (new_audio_rms + 1e-9))
     scale = np.clip(scale, 0, 10)
@@ -59,40 +62,23 @@ def old_triangle_wave_maker(audio, window):
 
 def triangle_wave_maker(audio, window):
 
+    audio = np.asarray(audio, dtype=float_dtype(audio))
+    lead, n = audio.shape[:-1], audio.shape[-1]
     deriv_audio = derivative(audio)
     root_mean_squared = apply_sliding_window_efficient(audio, window, rms)
 
-    crossovers = []
-    total_crossovers = 1
-
-    
-    new_audio = [0]
-    direction = 1
-    sign = np.sign(deriv_audio)
-
-    for i in tqdm(range(1, len(audio))):
-        coinciding = direction * deriv_audio[i-1] > 0
-
-        if not coinciding:
-            crossovers.append(1)
-            total_crossovers += 1
-        else:
-            crossovers.append(0)
+    # Step i compares the slope at i-1 with the direction taken at step i-1
+    direction = np.concatenate([np.ones(lead + (1,)), np.sign(deriv_audio[..., :-2])], axis=-1)[..., :n - 1]
+    crossovers = ~(direction * deriv_audio[..., :-1] > 0)
+    total_crossovers = 1 + window_sum(crossovers, window)
 
-        if len(crossovers) > window:
-            total_crossovers -= crossovers.pop(0)
+    slope = root_mean_squared[..., 1:] * 2 * (3**.5) * total_crossovers / np.minimum(window, np.arange(1, n))
+    # The running sum and the DC blocker work in float64; the rest in the signal's precision
+    new_audio = np.concatenate([np.zeros(lead + (1,)), np.cumsum(np.sign(deriv_audio[..., :-1]) * slope, axis=-1, dtype=np.float64)], axis=-1)
 
-        direction = np.sign(deriv_audio[i-1])
-
-        slope = root_mean_squared[i] * 2 * (3**.5) * total_crossovers / min(window, i)
-
-        new_audio.append(new_audio[-1] + (direction * slope))
-
-    new_audio = highpass_dc_block(new_audio)
-    new_audio = np.array(new_audio)
+    new_audio = highpass_dc_block(new_audio).astype(audio.dtype, copy=False)
     new_audio_rms = apply_sliding_window_efficient(new_audio, window, rms)
     scale = (root_mean_squared / (new_audio_rms + 1e-9))
     scale = np.clip(scale, 0, 10)
     new_audio = new_audio * scale
     return new_audio
-
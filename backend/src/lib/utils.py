@@ -1,39 +1,61 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.integrate import cumulative_trapezoid as cumtrapz
-from functools import partial
-from joblib import Memory
-from tqdm import tqdm
-import copy
-import librosa
 import soundfile as sf
-from typing import Tuple, Union
+from typing import Tuple, Union, BinaryIO
+import io
 import os
+import shutil
+import struct
+import tempfile
+import soxr
+from lib.filters import dc_block
 
-memory = Memory("./cache_dir", verbose=0)  # Cache directory
 
+# Signals are 1-D, or (channels, samples) with time along the last axis. Results keep the
+# signal's float precision, so float32 audio stays float32; running sums accumulate in float64.
+
+# Float precisions a signal can be processed in
+DTYPES = {'float32': np.float32, 'float64': np.float64}
+
+def float_dtype(arr):
+    # float32 for float32 and narrower inputs, float64 otherwise
+    return np.result_type(np.asarray(arr).dtype, np.float32)
 
 def derivative(array):
-    if len(array) == 1:
-        return np.array([0])
-    return np.gradient(array)
+    if np.shape(array)[-1] == 1:
+        return np.zeros(np.shape(array), dtype=int)
+    return np.gradient(array, axis=-1)
 
 def integral(array):
-    x = np.linspace(0, 1, len(array))  # Define x values
-    return np.array(cumtrapz(array, x, initial=0)) * len(array) # Integration
+    from scipy.integrate import cumulative_trapezoid as cumtrapz
+    n = np.shape(array)[-1]
+    x = np.linspace(0, 1, n)  # Define x values
+    return np.array(cumtrapz(array, x, axis=-1, initial=0)) * n # Integration
 
 def bad_integral(array):
 
-    cumsum = np.cumsum(array)
-    return cumsum - cumsum[0]
+    cumsum = np.cumsum(array, axis=-1)
+    return cumsum - cumsum[..., :1]
 
 def apply_sliding_window_efficient(arr, window_size, func, zero_fill=False):
+    kernel = _WINDOW_KERNELS.get(func)
+    if kernel is not None:
+        return kernel(np.asarray(arr), window_size, zero_fill)
+    return apply_sliding_window_generic(arr, window_size, func, zero_fill=zero_fill)
+
+def apply_sliding_window_generic(arr, window_size, func, zero_fill=False):
+    if np.ndim(arr) > 1:
+        # Arbitrary window functions only see one channel at a time
+        arr = np.asarray(arr)
+        rows = arr.reshape(-1, arr.shape[-1])
+        return np.stack([apply_sliding_window_generic(row, window_size, func, zero_fill)
+                         for row in rows]).reshape(arr.shape)
+
     n = len(arr)
-    result = np.empty(n, dtype=np.float64)  # Output array of same length
+    result = np.empty(n, dtype=float_dtype(arr))  # Output array of same length
 
     # Handle growing windows at the start
     if zero_fill:
-        arr = np.concatenate([np.zeros(window_size - 1), arr])
+        arr = np.concatenate([np.zeros(window_size - 1, dtype=result.dtype), arr])
     else:
         for i in range(min(window_size - 1, n)):  # Up to window_size-1 elements
             result[i] = func(arr[:i+1])  # Compute function on progressively larger windows
@@ -49,6 +71,96 @@ def apply_sliding_window_efficient(arr, window_size, func, zero_fill=False):
 
     return result
 
+# Samples per group of blocks whose float64 cumulative sums are held at once
+WINDOW_SUM_CHUNK = 1 << 18
+
+def window_sum(arr, window_size):
+    # Trailing window sums, growing over the first window_size-1 samples. Cumulative sums
+    # restart every window_size samples so rounding stays relative to the window's own
+    # magnitude: a window is the head of its block plus the tail of the previous block.
+    # The sums run in float64 a group of blocks at a time, into the input's precision.
+    x = np.asarray(arr)
+    lead, n = x.shape[:-1], x.shape[-1]
+    n_blocks = -(-n // window_size)
+    blocks = np.zeros(lead + (n_blocks * window_size,), dtype=float_dtype(x))
+    blocks[..., :n] = x
+    blocks = blocks.reshape(lead + (n_blocks, window_size))
+    result = np.empty_like(blocks)
+
+    step = max(WINDOW_SUM_CHUNK // window_size, 1)
+    for start in range(0, n_blocks, step):
+        # Each group also sums the block before it, whose tail reaches into its first block
+        first, end = max(start - 1, 0), min(start + step, n_blocks)
+        head = np.cumsum(blocks[..., first:end, :], axis=-1, dtype=np.float64)
+        tail = np.cumsum(blocks[..., first:end - 1, ::-1], axis=-1, dtype=np.float64)[..., ::-1]
+
+        # Sample j of block k (k >= 1, j < window_size-1) adds samples j+1.. of block k-1
+        head[..., 1:, :-1] += tail[..., :, 1:]
+        result[..., start:end, :] = head[..., start - first:, :]
+    return result.reshape(lead + (-1,))[..., :n]
+
+def window_length(n, window_size, zero_fill=False, dtype=np.float64):
+    # Number of samples each window is averaged over; zero_fill counts the padding
+    length = np.full(n, window_size, dtype=dtype)
+    if not zero_fill:
+        growing = min(window_size - 1, n)
+        length[:growing] = np.arange(1, growing + 1)
+    return length
+
+def windowed_mean(arr, window_size, zero_fill=False):
+    sums = window_sum(arr, window_size)
+    return np.divide(sums, window_length(sums.shape[-1], window_size, zero_fill, sums.dtype), out=sums)
+
+def windowed_rms(arr, window_size, zero_fill=False):
+    # Clip tiny negative mean squares left over from prefix-sum cancellation
+    mean_square = windowed_mean(np.square(arr, dtype=float_dtype(arr)), window_size, zero_fill)
+    return np.sqrt(np.maximum(mean_square, 0, out=mean_square), out=mean_square)
+
+def windowed_abs_mean(arr, window_size, zero_fill=False):
+    return windowed_mean(np.abs(arr), window_size, zero_fill)
+
+def _windowed_masked_mean(arr, window_size, mask):
+    # Padding zeros never pass the mask, so zero_fill does not change the result
+    count = window_sum(mask, window_size)
+    total = window_sum(arr * mask, window_size)
+    return np.sign(count) * (total / (count + 1e-5))
+
+def windowed_mean_positive(arr, window_size, zero_fill=False):
+    return _windowed_masked_mean(arr, window_size, (arr > 0).astype(float_dtype(arr)))
+
+def windowed_mean_negative(arr, window_size, zero_fill=False):
+    return _windowed_masked_mean(arr, window_size, (arr < 0).astype(float_dtype(arr)))
+
+def windowed_mean_crossovers(arr, window_size, zero_fill=False):
+    # Only signs of differences are taken, and those are exact in any float precision
+    x = np.asarray(arr, dtype=float_dtype(arr))
+    lead, n = x.shape[:-1], x.shape[-1]
+    if zero_fill:
+        x = np.concatenate([np.zeros(lead + (window_size - 1,), dtype=x.dtype), x], axis=-1)
+
+    end = np.arange(x.shape[-1] - n, x.shape[-1])
+    start = np.maximum(end - window_size + 1, 0)
+    length = end - start + 1
+
+    # mean_crossovers takes np.gradient of each window: central differences inside the
+    # window, one-sided differences at its two edges. Interior pairs come from a prefix
+    # sum over the global central-difference signs, the two edge pairs are patched in.
+    forward = np.sign(np.diff(x, axis=-1))
+    central = np.zeros(x.shape, dtype=x.dtype)
+    central[..., 1:-1] = np.sign(x[..., 2:] - x[..., :-2])
+    pairs = (central[..., 1:-2] * central[..., 2:-1]) < 0
+    pair_sum = np.concatenate([np.zeros(lead + (1,), dtype=int), np.cumsum(pairs, axis=-1)], axis=-1)
+
+    result = np.full(lead + (n,), np.nan, dtype=x.dtype)  # A single-sample window has no pairs to average
+    result[..., length == 2] = 0.0
+    idx = np.nonzero(length >= 3)[0]
+    s, e = start[idx], end[idx]
+    head = forward[..., s] * central[..., s + 1] < 0
+    tail = central[..., e - 1] * forward[..., e - 1] < 0
+    interior = pair_sum[..., e - 2] - pair_sum[..., s]
+    result[..., idx] = (head + interior + tail) / (length[idx] - 1)
+    return result
+
 def rms(audio):
     return np.sqrt(np.mean(audio**2))
 
@@ -68,12 +180,7 @@ def mean_negative(audio):
 
 
 def highpass_dc_block(signal, alpha=0.995):
-    y = np.zeros_like(signal)
-    prev_y, prev_x = 0, 0
-    for i, x in enumerate(signal):
-        y[i] = x - prev_x + alpha * prev_y
-        prev_x = x
-        prev_y = y[i]
+    y, _, _ = dc_block(signal, alpha)
     return y
 
 def mean_crossovers(audio):
@@ -85,13 +192,39 @@ def mean_crossovers(audio):
 
     return np.mean(crossovers)
 
-def load_audio_file(file_path: str, target_sr: int = 44100) -> Tuple[np.ndarray, int]:
+# soxr recipes per tier; 'high' is what librosa.load used, 'fast' is soxr's quick converter
+RESAMPLE_QUALITIES = {'fast': 'QQ', 'high': 'HQ'}
+
+def resample_audio(signal: np.ndarray, orig_sr: int, target_sr: int, quality: str = 'high') -> np.ndarray:
+    """
+    Resample along the last axis.
+
+    Args:
+        signal (np.ndarray): Mono or (channels, samples) signal
+        orig_sr (int): Sample rate of the signal
+        target_sr (int): Sample rate to convert to
+        quality (str): 'fast' (roughly 40% quicker, more aliasing) or 'high' (default: 'high')
+
+    Returns:
+        np.ndarray: The resampled signal, in the input's dtype
+    """
+    if quality not in RESAMPLE_QUALITIES:
+        raise ValueError(f"quality must be one of {sorted(RESAMPLE_QUALITIES)}")
+    if orig_sr == target_sr:
+        return signal
+    # soxr works on (samples, channels) frames
+    return soxr.resample(signal.T, orig_sr, target_sr, quality=RESAMPLE_QUALITIES[quality]).T
+
+def load_audio_file(source: Union[str, bytes, BinaryIO], target_sr: int = 44100, mono: bool = True,
+                    quality: str = 'high') -> Tuple[np.ndarray, int]:
     """
-    Load an audio file and convert it to a numpy array.
+    Load an audio file and convert it to a float32 numpy array.
     
     Args:
-        file_path (str): Path to the audio file
-        target_sr (int): Target sampling rate (default: 44100)
+        source (str | bytes | BinaryIO): Path to the audio file, its raw bytes, or a file-like object
+        target_sr (int | None): Target sampling rate, or None to keep the file's own (default: 44100)
+        mono (bool): Downmix to mono; otherwise multichannel files load as (channels, samples)
+        quality (str): Resampling tier when the rates differ, see resample_audio (default: 'high')
         
     Returns:
         Tuple[np.ndarray, int]: (audio signal, sample rate)
@@ -102,44 +235,137 @@ def load_audio_file(file_path: str, target_sr: int = 44100) -> Tuple[np.ndarray,
         - OGG
         - FLAC
     """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    start = source.tell() if hasattr(source, 'seek') else None
+
     try:
-        # Try loading with librosa first (supports more formats)
-        signal, sr = librosa.load(file_path, sr=target_sr, mono=True)
-        print('we take the try path in librosa')
-        return signal, sr
-    except Exception as e:
-        # Fallback to soundfile for WAV files
+        # soundfile decodes WAV/FLAC/OGG (and MP3 with recent libsndfile) straight into one buffer
+        with sf.SoundFile(source) as f:
+            sr = f.samplerate
+            frames = np.empty((f.frames, f.channels) if f.channels > 1 else f.frames, dtype=np.float32)
+            frames = frames[:len(f.read(out=frames))]
+        if frames.ndim == 1:
+            signal = frames
+        else:
+            signal = frames.mean(axis=1) if mono else frames.T
+    except Exception:
+        # Anything else goes through librosa's audioread fallback, which only reads paths
         try:
-            signal, sr = sf.read(file_path)
-            if len(signal.shape) > 1:  # If stereo, convert to mono
-                signal = np.mean(signal, axis=1)
-            if sr != target_sr:
-                signal = librosa.resample(signal, orig_sr=sr, target_sr=target_sr)
-                sr = target_sr
-            return signal, sr
+            import librosa
+            if isinstance(source, (str, os.PathLike)):
+                signal, sr = librosa.load(source, sr=None, mono=mono)
+            else:
+                if start is not None:
+                    source.seek(start)
+                signal, sr = load_spilled(source, mono)
         except Exception as e:
             raise ValueError(f"Could not load audio file: {str(e)}")
 
-def save_audio_file(signal: np.ndarray, sample_rate: int, file_path: str) -> None:
+    if target_sr is not None and sr != target_sr:
+        signal = resample_audio(signal, sr, target_sr, quality)
+        sr = target_sr
+    return signal, sr
+
+def load_spilled(source: BinaryIO, mono: bool) -> Tuple[np.ndarray, int]:
+    # Write a file-like source to a temporary file so librosa can hand audioread a path
+    import librosa
+    with tempfile.NamedTemporaryFile(delete=False) as spilled:
+        shutil.copyfileobj(source, spilled)
+    try:
+        return librosa.load(spilled.name, sr=None, mono=mono)
+    finally:
+        os.remove(spilled.name)
+
+def save_audio_file(signal: np.ndarray, sample_rate: int, destination: Union[str, BinaryIO, None] = None, format: str = None) -> Union[bytes, None]:
     """
     Save a numpy array as an audio file.
     
     Args:
-        signal (np.ndarray): Audio signal to save
+        signal (np.ndarray): Audio signal to save, mono or (channels, samples)
         sample_rate (int): Sample rate of the signal
-        file_path (str): Path where to save the file
+        destination (str | BinaryIO | None): Path or file-like object to write to; None returns the encoded bytes
+        format (str): Container format, inferred from the extension for paths and WAV otherwise
+        
+    Returns:
+        bytes | None: The encoded file when no destination is given
         
     Supported formats:
         - WAV
         - FLAC
         - OGG
     """
+    if format is None and not isinstance(destination, (str, os.PathLike)):
+        format = 'WAV'
+    buffer = io.BytesIO() if destination is None else None
+
     try:
-        # Normalize signal to prevent clipping
-        signal = librosa.util.normalize(signal)
-        # Use soundfile to save the audio
-        sf.write(file_path, signal, sample_rate)
+        # Normalize signal to prevent clipping, with one gain for all channels
+        peak = np.max(np.abs(signal)) if np.size(signal) else 0.0
+        if peak > np.finfo(np.float32).tiny:
+            signal = signal / peak
+        # Use soundfile to save the audio; it expects (samples, channels)
+        sf.write(destination if buffer is None else buffer, signal.T, sample_rate, format=format)
     except Exception as e:
         raise ValueError(f"Could not save audio file: {str(e)}")
 
+    if buffer is not None:
+        return buffer.getvalue()
+
+
+_WINDOW_KERNELS = {
+    rms: windowed_rms,
+    abs_mean: windowed_abs_mean,
+    np.mean: windowed_mean,
+    mean_positive: windowed_mean_positive,
+    mean_negative: windowed_mean_negative,
+    mean_crossovers: windowed_mean_crossovers,
+}
+
+def read_audio_chunks(file, target_sr: int = 44100, blocksize: int = 65536, mono: bool = True):
+    """
+    Decode an audio file block by block, resampling on the fly.
+
+    Args:
+        file: Path or file-like object readable by soundfile
+        target_sr (int): Target sampling rate (default: 44100)
+        blocksize (int): Frames decoded per block (default: 65536)
+        mono (bool): Downmix to mono; otherwise chunks are (channels, samples), even for mono files
+
+    Yields:
+        np.ndarray: Consecutive chunks at target_sr
+    """
+    with sf.SoundFile(file) as source:
+        channels = 1 if mono else source.channels
+        resampler = None
+        if source.samplerate != target_sr:
+            resampler = soxr.ResampleStream(source.samplerate, target_sr, channels, dtype='float32')
+        for block in source.blocks(blocksize=blocksize, dtype='float32', always_2d=True):
+            # soxr works on (samples, channels) frames, like soundfile
+            frames = np.mean(block, axis=1, keepdims=True) if mono else block
+            if resampler is not None:
+                frames = resampler.resample_chunk(frames)
+            if len(frames):
+                yield frames[:, 0] if mono else frames.T
+        if resampler is not None:
+            frames = resampler.resample_chunk(np.zeros((0, channels), dtype=np.float32), last=True)
+            if len(frames):
+                yield frames[:, 0] if mono else frames.T
+
+def wav_stream_header(sample_rate: int, channels: int = 1) -> bytes:
+    """
+    Header for a 16-bit PCM WAV whose length is not known up front.
+
+    The RIFF and data sizes are set to 0xFFFFFFFF, which players treat as
+    "read until the end of the stream".
+    """
+    block_align = channels * 2
+    return (b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, sample_rate,
+                                    sample_rate * block_align, block_align, 16)
+            + b'data' + struct.pack('<I', 0xFFFFFFFF))
 
+def encode_pcm16(signal: np.ndarray) -> bytes:
+    # Streams cannot be peak-normalized ahead of time, so samples are clipped instead.
+    # (channels, samples) input is interleaved frame by frame, as WAV expects.
+    return (np.clip(np.asarray(signal).T, -1.0, 1.0) * 32767).astype('<i2').tobytes()
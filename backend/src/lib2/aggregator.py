@@ -2,18 +2,29 @@ from lib2.sound_processor import SoundProcessor
 
 
 class Aggregator(SoundProcessor):
-    def __init__(self, input_names, output_name, function):
+    def __init__(self, input_names, output_name, function, block_function=None):
         input_streams = {input_names[i]: input_names[i] for i in range(len(input_names))}
         output_assignments = {'output': output_name}
         super().__init__(input_streams, output_assignments)
         self.function = function
+        self.block_function = block_function
 
         
+    def signature(self):
+        return (self.function, self.block_function)
+
     def process(self, processes):
 
         inputs = [processes[self[input]][-1] for input in self.input_streams]
         output = self.function(inputs)
         processes[self.output_assignments['output']].append(output) 
 
-        
+    def process_block(self, processes, n):
+
+        inputs = [self.read_block(processes, input, n) for input in self.input_streams]
+        if self.block_function is not None:
+            output = self.block_function(inputs)
+        else:
+            output = [self.function(list(values)) for values in zip(*inputs)]
+        self.write_block(processes, 'output', output)
 
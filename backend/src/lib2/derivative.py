@@ -10,6 +10,12 @@ class Derivative(SoundProcessor):
         
 
 
+    def signature(self):
+        return ()
+
+    def lookback(self, key):
+        return 1
+
     def process(self, processes):
         input_stream = processes[self['input']]
         
@@ -24,3 +30,15 @@ class Derivative(SoundProcessor):
 
         processes[self['output']].append(output)
 
+    def process_block(self, processes, n):
+        input_block = self.read_block(processes, 'input', n, history=1)
+        time_block = self.read_block(processes, 'time', n, history=1)
+
+        output = np.diff(input_block) / np.diff(time_block)
+
+        # The very first sample of a stream has no previous sample to difference against
+        if len(input_block) == n:
+            output = np.concatenate(([0], output))
+
+        self.write_block(processes, 'output', output)
+
@@ -6,6 +6,10 @@ class Discretizor(WaveShaper):
     def __init__(self, input_name, output_name, bias=0):
         function = lambda x: np.sign(x + bias)
         super().__init__(input_name, output_name, function)
+        self.bias = bias
+
+    def signature(self):
+        return (self.bias,)
 
 
 
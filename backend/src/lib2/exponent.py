@@ -3,5 +3,9 @@ import numpy as np
 
 class Exponent(WaveShaper):
     def __init__(self, input_name, output_name, exponent):
-        super().__init__(input_name, output_name, lambda x: x ** exponent)
+        super().__init__(input_name, output_name, lambda x: np.float_power(x, exponent))
+        self.exponent = exponent
+
+    def signature(self):
+        return (self.exponent,)
 
@@ -10,6 +10,12 @@ class FixedWindowGeneric(SoundProcessor):
         self.function = function
         self.window = window
 
+    def signature(self):
+        return (self.function, self.window)
+
+    def lookback(self, key):
+        return self.window - 1
+
     def process(self, processes):
 
         input_stream = processes[self['input']]
@@ -20,4 +26,16 @@ class FixedWindowGeneric(SoundProcessor):
             new_output = self.function(np.array(input_stream[-functional_window:]))
         processes[self['output']].append(new_output)
 
-        
\ No newline at end of file
+    def process_block(self, processes, n):
+
+        if self.window == 1:
+            input_block = self.read_block(processes, 'input', n)
+            new_output = self.function(input_block)
+            # Functions that do not broadcast over arrays are applied sample by sample
+            if np.shape(new_output) != input_block.shape:
+                new_output = [self.function(x) for x in input_block]
+        else:
+            input_block = self.read_block(processes, 'input', n, history=self.window - 1)
+            ends = range(len(input_block) - n + 1, len(input_block) + 1)
+            new_output = [self.function(input_block[max(end - self.window, 0):end]) for end in ends]
+        self.write_block(processes, 'output', new_output)
@@ -4,6 +4,12 @@ from lib2.wave_shaper import WaveShaper
 from lib2.running_sum import RunningSum
 from lib2.multiplier import Multiplier
 from lib2.module_applier import ModuleApplier
+import numpy as np
+
+
+def nonzero(x):
+    return np.not_equal(x, 0).astype(int)
+
 
 class FlatCounter(ModuleApplier):
     def __init__(self, input_name, output_name, window):
@@ -14,8 +20,8 @@ class FlatCounter(ModuleApplier):
             Derivative(input_name, intermediate_name + 'derivative'),
             Discretizor(intermediate_name + 'derivative', intermediate_name + 'discretized'),
             Derivative(intermediate_name + 'discretized', intermediate_name + 'derivative_2'),
-            WaveShaper(intermediate_name + 'derivative_2', intermediate_name + 'wave_shaper', lambda x: (x != 0).astype(int)),
-            WaveShaper(intermediate_name + 'discretized', intermediate_name + 'wave_shaper_2', lambda x: (x != 0).astype(int)),
+            WaveShaper(intermediate_name + 'derivative_2', intermediate_name + 'wave_shaper', nonzero),
+            WaveShaper(intermediate_name + 'discretized', intermediate_name + 'wave_shaper_2', nonzero),
             Multiplier([intermediate_name + 'wave_shaper', intermediate_name + 'wave_shaper_2'], intermediate_name + 'multiplier'),
             RunningSum(intermediate_name + 'multiplier', output_name, window)
         ]
@@ -1,4 +1,5 @@
 from lib2.sound_processor import SoundProcessor
+import numpy as np
 
 
 class FunctionalWindowLength(SoundProcessor):
@@ -9,6 +10,9 @@ class FunctionalWindowLength(SoundProcessor):
         super().__init__(input_streams, output_assignments)
         self.window = window
 
+    def signature(self):
+        return (self.window,)
+
     def process(self, processes):
         input_stream = processes[self['input']]
         total_duration = len(input_stream)
@@ -16,8 +20,8 @@ class FunctionalWindowLength(SoundProcessor):
             processes[self['output']].append(total_duration)
         else:
             processes[self['output']].append(self.window)
-        
-        
-        
-        
-        
\ No newline at end of file
+
+    def process_block(self, processes, n):
+        total_duration = len(processes[self['input']])
+        durations = np.arange(total_duration - n + 1, total_duration + 1)
+        self.write_block(processes, 'output', np.minimum(durations, self.window))
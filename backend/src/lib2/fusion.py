@@ -0,0 +1,104 @@
+from lib2.running_sum import RunningSum
+from lib2.functional_window_length import FunctionalWindowLength
+from lib2.exponent import Exponent
+from lib2.multiplier import Multiplier
+from lib2.fixed_window_generic import FixedWindowGeneric
+from lib2.wave_shaper import WaveShaper
+from lib2.windowed_mean import WindowedMean, compose
+
+
+def fuse(modules, keep=(), aliases=None):
+    """
+    Rewrite recognized processor chains into fused kernels.
+
+    - RunningSum + FunctionalWindowLength + Exponent(-1) + Multiplier (a Mean) -> WindowedMean
+    - an elementwise shaper feeding a WindowedMean, or fed by one -> folded into it
+    - two chained elementwise shapers -> one shaper running the composed function
+
+    Only streams read by nothing but the next stage of the chain are fused away; streams
+    in `keep` (requested outputs and taps) always stay materialized. Fused processors
+    round exactly like the chains they replace, growing-window warmup included.
+
+    Args:
+        modules (list): Scheduled leaf SoundProcessors
+        keep (set): Stream names that must still be produced
+        aliases (dict): Duplicate stream names and the streams that replace them
+
+    Returns:
+        list: The rewritten schedule.
+    """
+    aliases = aliases or {}
+    keep = {aliases.get(name, name) for name in keep}
+    modules = list(modules)
+
+    while True:
+        rewrite = find_rewrite(modules, keep, aliases)
+        if rewrite is None:
+            return modules
+        replaced, fused = rewrite
+        # The last replaced processor runs after all the others' inputs are ready
+        position = max(modules.index(module) for module in replaced)
+        modules[position] = fused
+        modules = [module for module in modules if not any(module is old for old in replaced)]
+
+
+def is_shaper(module):
+    return isinstance(module, FixedWindowGeneric) and module.window == 1
+
+
+def find_rewrite(modules, keep, aliases):
+    resolve = lambda name: aliases.get(name, name)
+
+    producers = {}
+    consumers = {}
+    for module in modules:
+        for name in module.output_assignments.values():
+            producers[name] = module
+        for name in list(module.input_streams.values()) + list(module.feedback_inputs.values()):
+            consumers.setdefault(resolve(name), []).append(module)
+
+    def only_feeds(name, consumer):
+        return name not in keep and consumers.get(name) == [consumer]
+
+    def source(module, key='input'):
+        name = resolve(module[key])
+        return name, producers.get(name)
+
+    for module in modules:
+        if type(module) is Multiplier and len(module.input_streams) == 2:
+            names = [resolve(name) for name in module.input_streams.values()]
+            for sum_name, inverse_name in (names, names[::-1]):
+                running_sum = producers.get(sum_name)
+                inverse = producers.get(inverse_name)
+                if type(running_sum) is not RunningSum or type(inverse) is not Exponent or inverse.exponent != -1:
+                    continue
+                length_name, length = source(inverse)
+                if (type(length) is FunctionalWindowLength and length.window == running_sum.window
+                        and resolve(length['input']) == resolve(running_sum['input'])
+                        and only_feeds(sum_name, module) and only_feeds(inverse_name, module)
+                        and only_feeds(length_name, inverse)):
+                    fused = WindowedMean(resolve(running_sum['input']), module['output'],
+                                         running_sum.window, constant=module.constant)
+                    return [running_sum, length, inverse, module], fused
+
+        if type(module) is WindowedMean:
+            input_name, shaper = source(module)
+            if is_shaper(shaper) and only_feeds(input_name, module):
+                fused = WindowedMean(resolve(shaper['input']), module['output'], module.window, module.constant,
+                                     before=compose(shaper.function, module.before), after=module.after)
+                return [shaper, module], fused
+
+            readers = consumers.get(module['output'], [])
+            if module['output'] not in keep and len(readers) == 1 and is_shaper(readers[0]):
+                shaper = readers[0]
+                fused = WindowedMean(resolve(module['input']), shaper['output'], module.window, module.constant,
+                                     before=module.before, after=compose(module.after, shaper.function))
+                return [module, shaper], fused
+
+        if is_shaper(module):
+            input_name, shaper = source(module)
+            if is_shaper(shaper) and only_feeds(input_name, module):
+                fused = WaveShaper(resolve(shaper['input']), module['output'], compose(shaper.function, module.function))
+                return [shaper, module], fused
+
+    return None
@@ -1,5 +1,6 @@
 
 from lib2.sound_processor import SoundProcessor
+from lib.filters import dc_block
 
 
 class HighpassDcBlock(SoundProcessor):
@@ -12,11 +13,22 @@ class HighpassDcBlock(SoundProcessor):
         self.prev_y = 0
         self.prev_x = 0
 
+    def signature(self):
+        return (self.alpha,)
+
     def process(self, processes):
         input_stream = processes[self['input']]
 
-        new_output = input_stream[-1] - self.prev_x + self.alpha * self.prev_y
+        # Same operation order as dc_block so single samples and blocks agree bit for bit
+        new_output = (self.alpha * self.prev_y - self.prev_x) + input_stream[-1]
         self.prev_x = input_stream[-1]
         self.prev_y = new_output
 
-        processes[self['output']].append(new_output)
\ No newline at end of file
+        processes[self['output']].append(new_output)
+
+    def process_block(self, processes, n):
+        self.write_block(processes, 'output', self.filter(self.read_block(processes, 'input', n)))
+
+    def filter(self, block):
+        output, self.prev_x, self.prev_y = dc_block(block, self.alpha, self.prev_x, self.prev_y)
+        return output
@@ -21,4 +21,17 @@ class InputFeeder(SoundProcessor):
 
         self.index += 1
 
+    def push(self, input_arrays):
+        # Queue more samples behind the ones not fed yet, for input that arrives over time
+        for name, array in input_arrays.items():
+            self.input_arrays[name] = np.concatenate([self.input_arrays[name][self.index:], array])
+        self.index = 0
+
+    def process_block(self, processes, n):
+
+        for output in self.output_assignments:
+            self.write_block(processes, output, self.input_arrays[output][self.index:self.index + n])
+
+        self.index += n
+
 
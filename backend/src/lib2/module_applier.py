@@ -1,14 +1,40 @@
 from lib2.sound_processor import SoundProcessor
+from lib2.schedule import schedule, merge_duplicates, prune
+from lib2.stream import Stream
+from lib2.fusion import fuse
 from lib2.utils import hash_instance
 
 
 class ModuleApplier(SoundProcessor):
-    def __init__(self, modules):
-        self.check_validity(modules)
+    def __init__(self, modules, taps=None, outputs=None, output_history=None):
 
         input_streams, output_assignments = self.build_in_out_streams(modules)
         super().__init__(input_streams, output_assignments)
         self.modules = modules
+        # Streams to keep in full even though the graph itself only looks back a little
+        self.taps = set(taps) if taps is not None else set()
+        # Streams the caller wants; when given, everything that cannot reach them is dropped
+        self.outputs = set(outputs) if outputs is not None else None
+        # Samples kept on outputs and taps besides the latest block (None: all of them).
+        # Long-running callers that read each block as it is produced can keep this at 0.
+        self.output_history = output_history
+
+        # Nested appliers are flattened into one static plan of leaf processors, and
+        # identical processors are run once with the duplicates' outputs aliased
+        self.ordered_modules, self.aliases = merge_duplicates(schedule(self.leaves()))
+        self.check_validity(self.ordered_modules)
+
+        if self.outputs is not None:
+            wanted = self.outputs | self.taps
+            produced = {name for module in self.ordered_modules for name in module.output_assignments.values()}
+            unknown = [name for name in wanted
+                       if self.resolve(name) not in produced and name not in self.input_streams]
+            if unknown:
+                raise Exception(f"Requested streams are not produced by any module: {unknown}")
+            self.ordered_modules = prune(self.ordered_modules, wanted, self.aliases)
+
+        # Chains of small building blocks run as fused kernels; kept streams stay materialized
+        self.ordered_modules = fuse(self.ordered_modules, self.taps | (self.outputs or set()), self.aliases)
 
 
     def build_in_out_streams(self, modules):
@@ -37,40 +63,81 @@ class ModuleApplier(SoundProcessor):
             print(full_outputs)
             raise Exception("Modules have duplicate outputs")
 
-    def check_first_sample(self, processes):
+    def leaves(self):
+        leaves = []
+        for module in self.modules:
+            leaves.extend(module.leaves())
+        return leaves
+
+    def resolve(self, name):
+        # Stream actually computed for a name, after duplicate processors were merged
+        return self.aliases.get(name, name)
+
+    def stream_history(self):
+        # Longest lookback any reader declares on each stream; None keeps the full history.
+        # Requested outputs and taps keep output_history on top of that. Without requested
+        # outputs, streams nobody in the graph reads are taken to be the outputs.
+        history = {}
+        for module in self.ordered_modules:
+            for key, name in list(module.input_streams.items()) + list(module.feedback_inputs.items()):
+                name = self.resolve(name)
+                history[name] = max(history.get(name, 0), module.lookback(key))
+        for module in self.ordered_modules:
+            for name in module.output_assignments.values():
+                if name not in history:
+                    history[name] = None if self.outputs is None else 0
+        for name in self.taps | (self.outputs or set()):
+            name = self.resolve(name)
+            if self.output_history is None or history.get(name) is None:
+                history[name] = self.output_history
+            else:
+                history[name] = max(history[name], self.output_history)
+        return history
+
+    def insert_outputs(self, processes):
+        history = self.stream_history()
+        for module in self.ordered_modules:
+            for output in module.output_assignments.values():
+                if output not in processes:
+                    processes[output] = Stream(history[output])
+            module.outputs_inserted = True
+        for name, original in self.aliases.items():
+            if name not in processes and original in processes:
+                processes[name] = processes[original]
+        self.outputs_inserted = True
+
+    def ready(self, processes):
 
-        return len(processes[self.output_assignments[list(self.output_assignments)[0]]]) == 0
+        if not self.outputs_inserted:
+            self.insert_outputs(processes)
+
+        missing = [name for name in self.input_streams.values() if name not in processes]
+        if missing:
+            raise Exception(f"Missing input streams: {missing}")
+
+        return True
 
 
     def process(self, processes):
 
-        if self.check_first_sample(processes):
-            self.get_order(processes)
-        else:
-            self.apply_modules(processes)
-
-
-    def get_order(self, processes):
-        self.ordered_modules = []
-
-        done_array = [False for _ in range(len(self.modules))]
-        for i in range(len(self.modules)):
-            for i, module in enumerate(self.modules):
-                if module.ready(processes) and not done_array[i]:
-                    self.ordered_modules.append(module)
-                    module.process(processes)
-                    done_array[i] = True
-                if len(self.ordered_modules) == len(self.modules):
-                    break
-        
-        if len(self.ordered_modules) != len(self.modules):
-            raise Exception("Modules are not ready")
-        
-    def apply_modules(self, processes):
+        if not self.outputs_inserted:
+            self.ready(processes)
+
         for module in self.ordered_modules:
             module.process(processes)
 
-        
-            
+    def process_block(self, processes, n):
+
+        if not self.outputs_inserted:
+            self.ready(processes)
 
+        if n > 0:
+            for module in self.ordered_modules:
+                module.process_block(processes, n)
 
+    def run(self, processes, n_samples, block_size=None):
+        # Process n_samples in blocks of block_size (default: all at once)
+        if block_size is None:
+            block_size = max(n_samples, 1)
+        for start in range(0, n_samples, block_size):
+            self.process_block(processes, min(block_size, n_samples - start))
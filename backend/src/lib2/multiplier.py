@@ -8,6 +8,11 @@ class Multiplier(Aggregator):
             input_names = [input_names]
 
         function = lambda x: np.prod(x) * constant
-        super().__init__(input_names, output_name, function)
+        block_function = lambda x: np.prod(x, axis=0) * constant
+        super().__init__(input_names, output_name, function, block_function)
+        self.constant = constant
+
+    def signature(self):
+        return (self.constant,)
 
 
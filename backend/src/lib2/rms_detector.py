@@ -16,6 +16,9 @@ class OldRmsDetector(SoundProcessor):
         self.rms = 0         # Root mean square value
 
 
+    def lookback(self, key):
+        return self.window
+
     def process(self, processes):
         # Get input stream from processes dict
         input_stream = processes[self['input']]
@@ -45,6 +48,31 @@ class OldRmsDetector(SoundProcessor):
         # processes[self['output']].append(self.rms)
         processes[self['output']].append(self.rms)
 
+    def process_block(self, processes, n):
+
+        total_duration = len(processes[self['input']])
+        squares = self.read_block(processes, 'input', n, history=self.window) ** 2
+        offset = total_duration - len(squares)
+        durations = np.arange(total_duration - n + 1, total_duration + 1)
+        entering = squares[-n:]
+
+        # Within the first window the mean square is the mean of every square so far
+        warming = int(np.count_nonzero(durations <= self.window))
+        ms = np.empty(n)
+        if warming:
+            totals = np.cumsum(np.concatenate(([self.ms * (durations[0] - 1)], entering[:warming])))[1:]
+            ms[:warming] = totals / durations[:warming]
+
+        # After that it slides: sample d adds its square and drops that of sample d - window
+        dropped = durations[warming:] - self.window - 1
+        leaving = squares[dropped - offset]
+        start = ms[warming - 1] if warming else self.ms
+        ms[warming:] = np.cumsum(np.concatenate(([start], (entering[warming:] - leaving) / self.window)))[1:]
+
+        self.ms = ms[-1]
+        self.rms = np.sqrt(self.ms)
+        self.write_block(processes, 'output', np.sqrt(ms))
+
 class RmsDetector(ModuleApplier):
     def __init__(self, input_name, output_name, window):
 
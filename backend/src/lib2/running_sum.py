@@ -1,4 +1,5 @@
 from lib2.sound_processor import SoundProcessor
+import numpy as np
 
 
 class RunningSum(SoundProcessor):
@@ -10,17 +11,51 @@ class RunningSum(SoundProcessor):
         self.window = window
         self.sum = 0
 
+    def signature(self):
+        return (self.window,)
+
+    def lookback(self, key):
+        return self.window
+
     def process(self, processes):
 
         input_stream = processes[self['input']]
         total_duration = len(input_stream)
 
-        self.sum = self.sum + input_stream[-1]
+        self.sum = self.sum + self.shape(input_stream[-1])
 
         if total_duration > self.window:
-            self.sum = self.sum - input_stream[-self.window - 1]
+            self.sum = self.sum - self.shape(input_stream[-self.window - 1])
+
+        processes[self['output']].append(self.finish(self.sum, total_duration))
+
+    def process_block(self, processes, n):
+
+        total_duration = len(processes[self['input']])
+        input_block = self.shape(self.read_block(processes, 'input', n, history=self.window))
+        offset = total_duration - len(input_block)
+
+        # Sample j drops sample j - window once the stream is longer than the window
+        dropped = np.arange(total_duration - n, total_duration) - self.window
+        leaving = np.where(dropped >= 0, input_block[np.maximum(dropped - offset, 0)], 0)
+
+        # Interleave adds and subtracts so the cumsum rounds exactly like process()
+        steps = np.empty(2 * n)
+        steps[0::2] = input_block[-n:]
+        steps[1::2] = -leaving
+        sums = np.cumsum(np.concatenate(([self.sum], steps)))[2::2]
+
+        self.sum = sums[-1]
+        durations = np.arange(total_duration - n + 1, total_duration + 1)
+        self.write_block(processes, 'output', self.finish(sums, durations))
+
+    def shape(self, values):
+        # Override in child classes to transform samples as they enter the sum
+        return values
 
-        processes[self['output']].append(self.sum)
+    def finish(self, sums, total_durations):
+        # Override in child classes to turn running sums into outputs
+        return sums
 
 
     
@@ -0,0 +1,112 @@
+import heapq
+
+
+def schedule(modules):
+    """
+    Topologically sort leaf processors by the streams they read and write.
+
+    Args:
+        modules (list): Leaf SoundProcessors, in declaration order
+
+    Returns:
+        list: The processors in an order where every stream is written before it is read.
+        Ties keep declaration order. Feedback inputs lag by a sample and add no ordering.
+    """
+    producers = {}
+    for index, module in enumerate(modules):
+        for name in module.output_assignments.values():
+            producers[name] = index
+
+    dependents = [[] for _ in modules]
+    pending = [0] * len(modules)
+    for index, module in enumerate(modules):
+        sources = {producers[name] for name in module.input_streams.values() if name in producers}
+        for source in sources:
+            dependents[source].append(index)
+        pending[index] = len(sources)
+
+    ready = [index for index in range(len(modules)) if pending[index] == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        index = heapq.heappop(ready)
+        order.append(modules[index])
+        for dependent in dependents[index]:
+            pending[dependent] -= 1
+            if pending[dependent] == 0:
+                heapq.heappush(ready, dependent)
+
+    if len(order) != len(modules):
+        stuck = [module.__class__.__name__ + str(list(module.output_assignments.values()))
+                 for index, module in enumerate(modules) if pending[index] > 0]
+        raise Exception(f"Modules form a cycle: {stuck}")
+
+    return order
+
+
+def merge_duplicates(modules):
+    """
+    Evaluate structurally identical processors once.
+
+    Two processors are identical when they have the same class, the same signature()
+    and read the same streams once earlier duplicates are resolved. Composites name their
+    intermediates after their input and window, so identical ones may also share output
+    names; those simply collapse into one writer. Walking in schedule
+    order means a processor's inputs are resolved before it is compared, so whole
+    duplicated chains collapse one stage at a time.
+
+    Args:
+        modules (list): Scheduled leaf SoundProcessors
+
+    Returns:
+        Tuple[list, dict]: (processors left to run, duplicate output name -> name of the
+        stream that replaces it)
+    """
+    aliases = {}
+    seen = {}
+    unique = []
+    for module in modules:
+        signature = module.signature()
+        if signature is not None and not module.feedback_inputs:
+            inputs = tuple(aliases.get(name, name) for name in module.input_streams.values())
+            key = (type(module), signature, inputs)
+            original = seen.get(key)
+            if original is not None:
+                for port, name in module.output_assignments.items():
+                    if name != original.output_assignments[port]:
+                        aliases[name] = original.output_assignments[port]
+                continue
+            seen[key] = module
+        unique.append(module)
+    return unique, aliases
+
+
+def prune(modules, wanted, aliases=None):
+    """
+    Drop processors whose outputs cannot reach any of the wanted streams.
+
+    Args:
+        modules (list): Scheduled leaf SoundProcessors
+        wanted (set): Names of the streams the caller asked for
+        aliases (dict): Duplicate stream names and the streams that replace them
+
+    Returns:
+        list: The live processors, in their scheduled order.
+    """
+    aliases = aliases or {}
+    needed = {aliases.get(name, name) for name in wanted}
+    live = set()
+    changed = True
+    # Feedback inputs can point forward in the schedule, so sweep until nothing changes
+    while changed:
+        changed = False
+        for module in reversed(modules):
+            if id(module) in live:
+                continue
+            if any(name in needed for name in module.output_assignments.values()):
+                live.add(id(module))
+                for name in list(module.input_streams.values()) + list(module.feedback_inputs.values()):
+                    needed.add(aliases.get(name, name))
+                changed = True
+
+    return [module for module in modules if id(module) in live]
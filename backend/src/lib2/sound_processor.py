@@ -1,3 +1,5 @@
+import numpy as np
+from lib2.stream import Stream
 
 # Base class for sound processing modules
 class SoundProcessor:
@@ -19,10 +21,38 @@ class SoundProcessor:
         # Override this method in child classes to implement processing logic
         pass
 
+    def process_block(self, processes, n):
+        # Override this method in child classes to process the next n samples at once.
+        # Inputs already hold the new samples; outputs must end up n samples longer.
+        raise NotImplementedError(f"{self.__class__.__name__} does not support block processing")
+
+    def signature(self):
+        # Hashable parameters that, with the class and the input streams, fully determine
+        # the output. Processors returning None are never merged with look-alikes.
+        return None
+
+    def lookback(self, key):
+        # Samples before the newest one this processor reads from an input stream.
+        # Override in child classes that look further back than [-1].
+        return 0
+
+    def read_block(self, processes, key, n, history=0):
+        # Last n samples of a stream plus up to `history` samples before them
+        stream = processes[self[key]]
+        start = max(len(stream) - n - history, 0)
+        return np.asarray(stream[start:], dtype=np.float64)
+
+    def write_block(self, processes, key, block):
+        processes[self[key]].extend(block)
+
+    def leaves(self):
+        # Leaf processors making up this one; composites flatten their modules
+        return [self]
+
     def insert_outputs(self, processes):
         for output in self.output_assignments:
             if self[output] not in processes:
-                processes[self[output]] = []
+                processes[self[output]] = Stream()
         self.outputs_inserted = True
 
     def __getitem__(self, key):
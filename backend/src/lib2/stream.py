@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class Stream:
+    """
+    Sample stream backed by a preallocated NumPy buffer.
+
+    Indexing follows the list semantics processors rely on: len() counts every sample
+    ever written and stream[-k] / stream[-k:] reach back from the newest one. A bounded
+    stream (history=N) only guarantees the newest write plus the N samples before it;
+    when its buffer fills, that tail is moved back to the front, so memory stays constant
+    however long the stream runs. history=None keeps every sample.
+    """
+
+    def __init__(self, history=None, capacity=1024):
+        self.history = history
+        size = capacity if history is None else 2 * history + capacity
+        self.buffer = np.empty(size)
+        self.start = 0    # Buffer index of the oldest retained sample
+        self.end = 0      # Buffer index one past the newest sample
+        self.length = 0   # Samples written over the stream's lifetime
+
+    def __len__(self):
+        return self.length
+
+    def reserve(self, n):
+        # Make room for n more samples, dropping what no reader needs any more
+        if self.end + n <= len(self.buffer):
+            return
+        held = self.end - self.start
+        keep = held if self.history is None else min(self.history, held)
+        if keep + n > len(self.buffer):
+            buffer = np.empty(max(keep + n, 2 * len(self.buffer)))
+            buffer[:keep] = self.buffer[self.end - keep:self.end]
+            self.buffer = buffer
+        else:
+            self.buffer[:keep] = self.buffer[self.end - keep:self.end]
+        self.start = 0
+        self.end = keep
+
+    def append(self, value):
+        if self.end == len(self.buffer):
+            self.reserve(1)
+        self.buffer[self.end] = value
+        self.end += 1
+        self.length += 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        self.reserve(n)
+        self.buffer[self.end:self.end + n] = values
+        self.end += n
+        self.length += n
+
+    def first_retained(self):
+        # Index (over the stream's lifetime) of the oldest sample still held
+        return self.length - (self.end - self.start)
+
+    def __getitem__(self, key):
+        # Fast path for the [-1] / [-k] reads of per-sample processing
+        if type(key) is int and self.start - self.end <= key < 0:
+            return self.buffer[self.end + key]
+        offset = self.start - self.first_retained()
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if start < self.first_retained() and start < stop:
+                raise IndexError(f"Samples before {self.first_retained()} are no longer retained")
+            # Views into the buffer are only valid until the next write
+            return self.buffer[start + offset:max(stop, start) + offset:step]
+        if key < 0:
+            key += self.length
+        if key < self.first_retained() or key >= self.length:
+            raise IndexError(f"Sample {key} is not retained (stream holds {self.first_retained()}..{self.length - 1})")
+        return self.buffer[key + offset]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.buffer[self.start:self.end], dtype=dtype)
+
+    def __iter__(self):
+        return iter(self.buffer[self.start:self.end].tolist())
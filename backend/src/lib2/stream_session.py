@@ -0,0 +1,70 @@
+import time
+import numpy as np
+from lib2.input_feeder import InputFeeder
+from lib2.module_applier import ModuleApplier
+from lib2.square_wave import SquareWave
+from lib2.rms_detector import RmsDetector
+from lib2.constants import sample_rate as default_sample_rate
+
+# Graphs a session can run, each built as Graph(input_name, output_name, window)
+GRAPHS = {
+    'square': SquareWave,
+    'rms': RmsDetector,
+}
+
+
+class StreamSession:
+    """
+    One causal processing graph fed with frames as they arrive.
+
+    Each frame is split into blocks of at most block_size samples and pushed through the
+    compiled graph; all windowed state lives in the graph, so consecutive frames continue
+    exactly where the previous one stopped. Only the latest block of each stream is kept.
+    """
+
+    def __init__(self, graph='square', window=1500, sample_rate=default_sample_rate, block_size=4096):
+        if graph not in GRAPHS:
+            raise ValueError(f"Unknown graph '{graph}', expected one of {sorted(GRAPHS)}")
+        if window < 1:
+            raise ValueError("Window must be at least 1 sample")
+
+        self.graph = graph
+        self.window = window
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.frames = 0
+
+        self.feeder = InputFeeder({'input': np.zeros(0)})
+        self.applier = ModuleApplier([self.feeder, GRAPHS[graph]('input', 'output', window)],
+                                     outputs=['output'], output_history=0)
+        self.processes = {}
+        self.applier.ready(self.processes)
+
+    def process(self, frame):
+        """
+        Process one frame of mono samples.
+
+        Returns:
+            Tuple[np.ndarray, dict]: (processed frame, timing report for the frame)
+        """
+        start = time.perf_counter()
+        frame = np.asarray(frame, dtype=np.float64)
+        self.feeder.push({'input': frame})
+
+        output = []
+        for offset in range(0, len(frame), self.block_size):
+            n = min(self.block_size, len(frame) - offset)
+            self.applier.process_block(self.processes, n)
+            output.append(np.array(self.processes['output'][-n:]))
+        output = np.concatenate(output) if output else np.zeros(0)
+
+        elapsed = time.perf_counter() - start
+        duration = len(frame) / self.sample_rate
+        self.frames += 1
+        report = {
+            'frame': self.frames,
+            'samples': len(frame),
+            'processing_ms': elapsed * 1000,
+            'realtime_factor': elapsed / duration if duration else 0.0,
+        }
+        return output, report
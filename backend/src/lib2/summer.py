@@ -8,5 +8,10 @@ class Summer(Aggregator):
             input_names = [input_names]
 
         function = lambda x: np.sum(x) + constant
-        super().__init__(input_names, output_name, function)
+        block_function = lambda x: np.sum(x, axis=0) + constant
+        super().__init__(input_names, output_name, function, block_function)
+        self.constant = constant
+
+    def signature(self):
+        return (self.constant,)
 
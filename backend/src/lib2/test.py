@@ -19,18 +19,21 @@ input_feeder = InputFeeder(input_arrays)
 
 square_wave = SquareWave('input', 'square_wave', 1500)
 
+# Only square_wave is computed for; 'input' and 'time' are tapped so they can be plotted
 module_applier = ModuleApplier([time_counter, 
                                 input_feeder,
                                 square_wave
-                                ])
+                                ], outputs=['square_wave'], taps=['input', 'time'])
 
 
 
 
+# Samples per process_block call: 1 reproduces sample-by-sample mode, None runs the whole signal at once
+block_size = 4096
+
 processes = {}
 module_applier.ready(processes)
-for i in range(len(input_arrays['input'])):
-    module_applier.process(processes)
+module_applier.run(processes, len(input_arrays['input']), block_size)
 
 
 
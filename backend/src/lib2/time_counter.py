@@ -1,3 +1,4 @@
+import numpy as np
 from lib2.sound_processor import SoundProcessor
 from lib2.constants import sample_rate
 
@@ -9,8 +10,17 @@ class TimeCounter(SoundProcessor):
         self.time = 0
         self.interval = 1/sample_rate
 
+    def signature(self):
+        return (self.interval,)
+
     def process(self, processes):
 
         processes[self['time']].append(self.time)
         self.time += self.interval
 
+    def process_block(self, processes, n):
+        # cumsum adds left to right, so this repeats the per-sample accumulation exactly
+        times = np.cumsum(np.concatenate(([self.time], np.full(n - 1, self.interval))))
+        self.write_block(processes, 'time', times)
+        self.time = times[-1] + self.interval
+
@@ -0,0 +1,38 @@
+from lib2.running_sum import RunningSum
+import numpy as np
+
+
+def compose(first, second):
+    # Apply first, then second, rounding to float64 in between like a stream would
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return lambda x: second(np.asarray(first(x), dtype=np.float64))
+
+
+class WindowedMean(RunningSum):
+    # Fused form of Mean: RunningSum, FunctionalWindowLength, Exponent(-1) and Multiplier
+    # in one processor. `before` and `after` are elementwise shapers folded in on either
+    # side, which turns RmsDetector's Exponent(2) -> Mean -> Exponent(0.5) into one step.
+    def __init__(self, input_name, output_name, window, constant=1, before=None, after=None):
+        super().__init__(input_name, output_name, window)
+        self.constant = constant
+        self.before = before
+        self.after = after
+
+    def signature(self):
+        return (self.window, self.constant, self.before, self.after)
+
+    def shape(self, values):
+        if self.before is None:
+            return values
+        return np.asarray(self.before(values), dtype=np.float64)
+
+    def finish(self, sums, total_durations):
+        # Same operations, in the same order, as the unfused Mean graph
+        lengths = np.minimum(total_durations, self.window)
+        mean = sums * np.float_power(lengths, -1) * self.constant
+        if self.after is None:
+            return mean
+        return self.after(mean)
@@ -1,13 +1,20 @@
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Set the backend before importing pyplot
-import matplotlib.pyplot as plt
 from lib.square import square_wave_maker
 from lib.triangle import triangle_wave_maker
-from lib.iterative_application import iterative_shape_applier, combo_shape_applier
+from lib.iterative_application import iterative_shape_applier, iterative_shape_steps, combo_shape_applier
+from lib.peaks import PeakPyramid, envelope_json
 import io
+import json
 
-def main(input_signal, sample_rate=44100, window_size=10000, plot_length=None, plot_offset=0, transformations=None):
+def pyplot():
+    # matplotlib is slow to import, so it is only loaded once a plot is rendered
+    import matplotlib
+    matplotlib.use('Agg')  # Set the backend before importing pyplot
+    import matplotlib.pyplot as plt
+    return plt
+
+def main(input_signal, sample_rate=44100, window_size=10000, plot_length=None, plot_offset=0, transformations=None,
+         plot_dpi=100, plot_size=(15, 12), plot_format='png', progress=None, plots=True, dtype=None):
     print('running main!')
     print('input signal is', input_signal)
     
@@ -15,7 +22,7 @@ def main(input_signal, sample_rate=44100, window_size=10000, plot_length=None, p
     Test different wave transformations on an input signal.
     
     Parameters:
-        input_signal (np.ndarray): Input audio signal
+        input_signal (np.ndarray): Input audio signal, mono or (channels, samples)
         sample_rate (int): Sampling rate of the signal (default: 44100)
         window_size (int): Window size for transformations (default: 10000)
         plot_length (int, optional): Number of samples to plot. If None, plots entire signal
@@ -25,9 +32,20 @@ def main(input_signal, sample_rate=44100, window_size=10000, plot_length=None, p
             - 'function': function to apply (for iterative type)
             - 'functions': list of functions (for combo type)
             - 'iterations': number of iterations (for iterative type)
+            - 'every_iteration': optional, for iterative type; when True the signal after
+              each iteration is added in turn, from 1 up to 'iterations', all from one run
+        plot_dpi (int): Resolution of the rendered plots (default: 100)
+        plot_size (tuple): Plot size in inches (default: (15, 12))
+        plot_format (str): 'png' for rendered plots, or 'json' for the min/max envelopes the
+            plots are drawn from, one point per pixel column
+        progress (callable, optional): Called as progress(stage, fraction) as work advances,
+            with fraction running from 0 to 1 over the whole call
+        plots (bool): Render the plots; when False both plot results are None (default: True)
+        dtype (str | np.dtype, optional): Float precision to process in, e.g. 'float32'; by
+            default the input's own (default: None)
     
     Returns:
-        tuple: (time array, list of transformed signals, full_plot_bytes, zoomed_plot_bytes)
+        tuple: (list of transformed signals, full_plot_bytes, zoomed_plot_bytes)
     """
     if transformations is None:
         transformations = [
@@ -38,45 +56,94 @@ def main(input_signal, sample_rate=44100, window_size=10000, plot_length=None, p
             }
         ]
     
-    # Create time array for plotting
-    duration = len(input_signal) / sample_rate
-    time = np.linspace(0, duration, len(input_signal))
+    input_signal = np.asarray(input_signal, dtype=dtype)
+    # Time runs along the last axis; plots convert sample positions to seconds themselves
+    n_samples = input_signal.shape[-1]
     
     # Store all transformed signals
     transformed_signals = []
     
+    # Transformations take the first 90% of reported progress, plotting the rest
+    def transform_progress(t, kind):
+        if progress is None:
+            return None
+        def report(done, total):
+            step = min(int(done) + 1, total)
+            progress(f'{kind} {step} of {total}',
+                     0.9 * (t + done / max(total, 1)) / len(transformations))
+        return report
+
     # Apply each transformation
-    for transform in transformations:
-        if transform['type'] == 'iterative':
-            signal = iterative_shape_applier(
+    for t, transform in enumerate(transformations):
+        if transform['type'] == 'iterative' and transform.get('every_iteration'):
+            signals = [cumulative for cumulative, _, _ in iterative_shape_steps(
+                transform['function'],
+                input_signal,
+                transform['iterations'],
+                window_size,
+                progress=transform_progress(t, 'iteration')
+            )]
+        elif transform['type'] == 'iterative':
+            signals = [iterative_shape_applier(
                 transform['function'],
                 input_signal,
                 transform['iterations'],
-                window_size
-            )
+                window_size,
+                progress=transform_progress(t, 'iteration')
+            )]
         elif transform['type'] == 'combo':
-            signal = combo_shape_applier(
+            signals = [combo_shape_applier(
                 transform['functions'],
                 input_signal,
-                window_size
-            )
-        transformed_signals.append(signal)
+                window_size,
+                progress=transform_progress(t, 'shape')
+            )]
+        transformed_signals.extend(signals)
+
+    if not plots:
+        return transformed_signals, None, None
+
+    if progress is not None:
+        progress('plotting', 0.9)
+
+    # Residuals and peak pyramids are computed once and shared by both plots
+    residuals = [input_signal - signal for signal in transformed_signals]
+    signal_series = [('Original', PeakPyramid(input_signal))] + [
+        (f'Transform {i+1}', PeakPyramid(signal)) for i, signal in enumerate(transformed_signals)]
+    residual_series = [
+        (f'Residual {i+1}', PeakPyramid(residual)) for i, residual in enumerate(residuals)]
+    columns = int(plot_size[0] * plot_dpi)
+
+    def draw(ax, series, start_idx, end_idx):
+        for i, (label, pyramid) in enumerate(series):
+            positions, mins, maxs = pyramid.envelope(start_idx, end_idx, columns)
+            if mins is maxs:
+                # Few enough samples to draw them directly
+                ax.plot(positions / sample_rate, mins, color=f'C{i}', label=label, alpha=0.7)
+            else:
+                ax.fill_between(positions / sample_rate, mins, maxs, color=f'C{i}',
+                                label=label, alpha=0.7, linewidth=0.5)
 
     # Function to create plots
-    def create_plots(start_idx, end_idx, figsize=(15, 12)):
+    def create_plots(start_idx, end_idx):
+        if plot_format == 'json':
+            return json.dumps({
+                'sampleRate': sample_rate,
+                'signals': [{'label': label, **envelope_json(pyramid, start_idx, end_idx, columns)}
+                            for label, pyramid in signal_series],
+                'residuals': [{'label': label, **envelope_json(pyramid, start_idx, end_idx, columns)}
+                              for label, pyramid in residual_series]
+            }, separators=(',', ':')).encode()
+
         # Set style for minimal look
+        plt = pyplot()
         plt.style.use('seaborn-v0_8-white')
-        fig = plt.figure(figsize=figsize)
+        fig = plt.figure(figsize=plot_size)
         
-        # Plot original signal
+        # Plot original signal and all transformations
         ax1 = plt.subplot(211)
         plt.title('Original vs Transformed', pad=20)
-        plt.plot(time[start_idx:end_idx], input_signal[start_idx:end_idx], label='Original', alpha=0.7)
-        
-        # Plot all transformations
-        for i, signal in enumerate(transformed_signals):
-            plt.plot(time[start_idx:end_idx], signal[start_idx:end_idx], 
-                    label=f'Transform {i+1}', alpha=0.7)
+        draw(ax1, signal_series, start_idx, end_idx)
         
         plt.legend(frameon=False)
         # Remove top and right spines
@@ -87,10 +154,7 @@ def main(input_signal, sample_rate=44100, window_size=10000, plot_length=None, p
         # Plot residuals
         ax2 = plt.subplot(212)
         plt.title('Residuals', pad=20)
-        for i, signal in enumerate(transformed_signals):
-            residual = input_signal - signal
-            plt.plot(time[start_idx:end_idx], residual[start_idx:end_idx], 
-                    label=f'Residual {i+1}', alpha=0.7)
+        draw(ax2, residual_series, start_idx, end_idx)
         
         plt.legend(frameon=False)
         # Remove top and right spines
@@ -101,7 +165,7 @@ def main(input_signal, sample_rate=44100, window_size=10000, plot_length=None, p
         
         # Save plot to bytes buffer
         buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight', facecolor='white')
+        plt.savefig(buf, format='png', dpi=plot_dpi, facecolor='white')
         buf.seek(0)
         plot_bytes = buf.getvalue()
         plt.close(fig)
@@ -110,17 +174,20 @@ def main(input_signal, sample_rate=44100, window_size=10000, plot_length=None, p
 
     # Create full plot
     if plot_length is None:
-        plot_length = len(input_signal)
-    end_idx = min(plot_offset + plot_length, len(input_signal))
+        plot_length = n_samples
+    end_idx = min(plot_offset + plot_length, n_samples)
     full_plot_bytes = create_plots(plot_offset, end_idx)
 
     # Create zoomed plot (25ms window at middle of signal)
     samples_per_ms = sample_rate // 1000
     zoom_window_ms = 50  # Changed from 100ms to 25ms
     zoom_samples = samples_per_ms * zoom_window_ms
-    mid_point = len(input_signal) // 2
+    mid_point = n_samples // 2
     zoom_start = mid_point - (zoom_samples // 2)
     zoom_end = mid_point + (zoom_samples // 2)
     zoomed_plot_bytes = create_plots(zoom_start, zoom_end)
+
+    if progress is not None:
+        progress('plotting', 1.0)
     
-    return time, transformed_signals, full_plot_bytes, zoomed_plot_bytes
\ No newline at end of file
+    return transformed_signals, full_plot_bytes, zoomed_plot_bytes
\ No newline at end of file
@@ -0,0 +1,128 @@
+from lib.utils import load_audio_file, save_audio_file
+from lib.square import square_wave_maker
+from main import main, pyplot
+
+SAMPLE_RATE = 44100
+
+
+def process_upload(content: bytes, iterations: int, window_size: int,
+                   plot_format: str = 'png', plot_dpi: int = 100, progress=None, mono: bool = False,
+                   plots: bool = True, native_rate: bool = False, resample_quality: str = 'high',
+                   dtype: str = 'float32', every_iteration: bool = False) -> dict:
+    """
+    Decode an uploaded file, run the iterative square-wave transform and render the plots.
+
+    Runs inside a pool worker, so everything it needs comes in as plain arguments.
+
+    Args:
+        content (bytes): Raw bytes of the uploaded audio file
+        iterations (int): Number of square-wave iterations
+        window_size (int): Window size for the transform
+        plot_format (str): 'png' for rendered plots or 'json' for their peak envelopes
+        plot_dpi (int): Resolution of the rendered plots
+        progress (callable, optional): Called as progress(stage, percent) as work advances
+        mono (bool): Downmix to mono instead of processing every channel
+        plots (bool): Render the plots; when False 'fullPlot' and 'zoomedPlot' are None
+        native_rate (bool): Process at the file's own sample rate instead of resampling to 44.1kHz
+        resample_quality (str): 'fast' or 'high', see lib.utils.resample_audio
+        dtype (str): Float precision to process in, one of lib.utils.DTYPES; float32 halves
+            the memory of every intermediate signal
+        every_iteration (bool): Also encode the result of every iteration count from 1 up to
+            `iterations`, all from the one run; the plots then show each of them
+
+    Returns:
+        dict: WAV bytes under 'audio', plot bytes under 'fullPlot' and 'zoomedPlot',
+            plus 'sampleRate', 'samples' and 'channels'. With every_iteration, 'variants'
+            lists the WAV bytes after 1..iterations iterations, ending with 'audio'
+    """
+    if progress is None:
+        progress = lambda stage, percent: None
+
+    # Decode straight from the uploaded bytes
+    progress('decode', 0.0)
+    signal, sr = load_audio_file(content, target_sr=None if native_rate else SAMPLE_RATE, mono=mono,
+                                 quality=resample_quality)
+
+    # Process the audio using your main function
+    transformed_signals, full_plot_bytes, zoomed_plot_bytes = main(
+        signal,
+        sample_rate=sr,
+        window_size=window_size,
+        plot_offset=0,
+        plot_format=plot_format,
+        plot_dpi=plot_dpi,
+        progress=lambda stage, fraction: progress(stage, 5.0 + 90.0 * fraction),
+        plots=plots,
+        dtype=dtype,
+        transformations=[
+            {
+                'type': 'iterative',
+                'function': square_wave_maker,
+                'iterations': iterations,
+                'every_iteration': every_iteration
+            }
+        ]
+    )
+
+    # Encode the processed audio into memory
+    progress('encode', 95.0)
+    variants = []
+    for transformed in transformed_signals:
+        variants.append(save_audio_file(transformed, sr))
+        progress('encode', 95.0 + 5.0 * len(variants) / len(transformed_signals))
+
+    result = {
+        "audio": variants[-1],
+        "fullPlot": full_plot_bytes,
+        "zoomedPlot": zoomed_plot_bytes,
+        "sampleRate": sr,
+        "samples": signal.shape[-1],
+        "channels": 1 if signal.ndim == 1 else signal.shape[0]
+    }
+    if every_iteration:
+        result["variants"] = variants
+    return result
+
+
+def process_batch(contents: list, iterations: int, window_size: int, plots: bool = False, **options) -> list:
+    """
+    Run process_upload over several uploads in one worker task, with the same options for all.
+
+    Grouping clips amortizes the cost of shipping work to a worker. A clip that fails does
+    not stop the rest; its entry holds the error message under 'error' instead.
+
+    Returns:
+        list: One process_upload result (or error) per upload, in order
+    """
+    results = []
+    for content in contents:
+        try:
+            results.append(process_upload(content, iterations, window_size, plots=plots, **options))
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def warm_up() -> dict:
+    """
+    Import and exercise the heavy dependencies once so a worker's first request is not slow.
+
+    Returns:
+        dict: Seconds taken by each step, in the order they ran
+    """
+    import importlib
+    import time
+    import numpy as np
+    signal = np.sin(np.linspace(0, 100, 4410))
+    steps = [
+        ('scipy.signal', lambda: importlib.import_module('scipy.signal')),
+        ('scipy.integrate', lambda: importlib.import_module('scipy.integrate')),
+        ('matplotlib', pyplot),
+        ('first run', lambda: save_audio_file(main(signal, sample_rate=44100, window_size=100)[0][0], 44100))
+    ]
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    return timings
@@ -0,0 +1,230 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the admission queue is full."""
+
+
+# Set in each worker by init_worker; carries (job id, stage, percent) back to the server
+progress_queue = None
+# Whatever the initializer returned in this worker, such as its warm-up timings
+startup_report = None
+
+
+def init_worker(queue, initializer):
+    global progress_queue, startup_report
+    progress_queue = queue
+    if initializer is not None:
+        startup_report = initializer()
+
+
+def spawned_worker():
+    # Holds a worker long enough that every worker gets spawned, then reports its startup
+    time.sleep(0.1)
+    return startup_report
+
+
+class ProgressReporter:
+    """
+    Picklable progress(stage, percent) callback that forwards updates for one job to the server.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def __call__(self, stage, percent):
+        if progress_queue is not None:
+            progress_queue.put((self.job_id, stage, percent))
+
+
+def timed_call(function, args):
+    # Runs in the worker: report when the job actually started so queue wait can be measured
+    started = time.time()
+    result = function(*args)
+    return started, time.time(), result
+
+
+class ProcessingPool:
+    """
+    Pre-warmed worker processes behind a bounded admission queue.
+
+    At most `workers` jobs run at once and at most `queue_size` more wait for a worker;
+    anything beyond that is rejected straight away with PoolSaturated, so a burst of large
+    uploads sheds load instead of piling up behind the event loop.
+    """
+
+    def __init__(self, workers=None, queue_size=None, initializer=None, on_progress=None):
+        self.workers = workers or int(os.environ.get('SYNTHFUZZ_WORKERS', os.cpu_count() or 1))
+        self.queue_size = queue_size if queue_size is not None else int(
+            os.environ.get('SYNTHFUZZ_QUEUE_SIZE', 2 * self.workers))
+        self.initializer = initializer
+        self.on_progress = on_progress
+        self.executor = None
+        self.progress_queue = None
+        self.listener = None
+        self.start_lock = threading.Lock()
+        self.startup = None
+
+        self.in_flight = 0
+        self.streams = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.busy_seconds = 0.0
+        self.started_at = None
+
+    def start(self):
+        """
+        Spawn and initialize every worker. Safe to call from several threads; the first
+        caller does the work and the rest wait for it.
+        """
+        with self.start_lock:
+            if self.executor is not None:
+                return
+            started = time.perf_counter()
+            # Spawned workers do not inherit the server's event loop or threads
+            context = multiprocessing.get_context('spawn')
+            # The progress listener outlives executors replaced by restart()
+            if self.listener is None:
+                self.progress_queue = context.Queue()
+                self.listener = threading.Thread(target=self.forward_progress, daemon=True)
+                self.listener.start()
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=(self.progress_queue, self.initializer)
+            )
+            # Workers start lazily; keep them all busy at once so every one is spawned and warm
+            try:
+                futures = [executor.submit(spawned_worker) for _ in range(self.workers)]
+                reports = [future.result() for future in futures]
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            self.executor = executor
+            self.started_at = time.time()
+            self.startup = {"seconds": time.perf_counter() - started, "workers": reports}
+
+    def restart(self, broken):
+        """
+        Replace an executor that lost a worker. Every job that hit the broken executor calls
+        this, so only the first replaces it and the rest find it already replaced.
+        """
+        with self.start_lock:
+            if self.executor is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self.restarts += 1
+        self.start()
+
+    def shutdown(self):
+        with self.start_lock:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
+            if self.listener is not None:
+                self.progress_queue.put(None)
+                self.listener.join()
+                self.listener = None
+
+    def forward_progress(self):
+        while (update := self.progress_queue.get()) is not None:
+            if self.on_progress is not None:
+                self.on_progress(*update)
+
+    def saturated(self):
+        return self.in_flight >= self.workers + self.queue_size
+
+    def admit(self):
+        """
+        Take an admission slot for work the server runs outside the workers, such as a
+        streamed response; it counts towards in_flight until release() is called.
+
+        Raises:
+            PoolSaturated: If the queue is already full.
+        """
+        if self.saturated():
+            self.rejected += 1
+            raise PoolSaturated(f"{self.in_flight} jobs in flight")
+        self.in_flight += 1
+        self.streams += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self.streams -= 1
+
+    async def run(self, function, *args):
+        """
+        Run function(*args) in a worker process and return its result.
+
+        Raises:
+            PoolSaturated: If the queue is already full.
+            BrokenProcessPool: If a worker died while the job was in flight, killed by the
+                OS for memory or crashed in native code. The pool is rebuilt for later jobs;
+                the other jobs in flight on the old workers fail with this too, since which
+                job killed the worker cannot be told apart.
+        """
+        # restart() swaps the executor from another thread, so read it once
+        executor = self.executor
+        if executor is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.start)
+            executor = self.executor
+
+        if self.saturated():
+            self.rejected += 1
+            raise PoolSaturated(f"{self.in_flight} jobs in flight")
+
+        self.in_flight += 1
+        self.submitted += 1
+        submitted_at = time.time()
+        try:
+            started, finished, result = await asyncio.wrap_future(
+                executor.submit(timed_call, function, args))
+        except BrokenProcessPool:
+            self.failed += 1
+            await asyncio.get_running_loop().run_in_executor(None, self.restart, executor)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        wait = max(started - submitted_at, 0.0)
+        self.completed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.busy_seconds += finished - started
+        return result
+
+    def stats(self):
+        uptime = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            "workers": self.workers,
+            "queueSize": self.queue_size,
+            "inFlight": self.in_flight,
+            "streams": self.streams,
+            "queueDepth": max(self.in_flight - self.workers, 0),
+            "busyWorkers": min(self.in_flight, self.workers),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "meanWaitSeconds": self.total_wait / self.completed if self.completed else 0.0,
+            "maxWaitSeconds": self.max_wait,
+            "utilization": self.busy_seconds / (self.workers * uptime) if uptime else 0.0,
+            "startup": self.startup,
+        }
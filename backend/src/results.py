@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class ResultTooLarge(Exception):
+    """Raised when a result on its own is bigger than the store's size cap."""
+
+
+class StoredResult:
+    def __init__(self, data: bytes, media_type: str):
+        self.data = data
+        self.media_type = media_type
+        self.etag = '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+class ResultStore:
+    """
+    Holds finished results in memory so they can be served from binary endpoints.
+
+    Every result is a group of named items (e.g. 'audio', 'plot/full') stored under one ID.
+    Results expire after a TTL, and the oldest are evicted first once the total size goes
+    over the cap.
+
+    Args:
+        ttl (float): Seconds a result is kept (default: SYNTHFUZZ_RESULT_TTL or 600)
+        max_bytes (int): Total size cap in bytes (default: SYNTHFUZZ_RESULT_MAX_BYTES or 512MB)
+    """
+
+    def __init__(self, ttl: float = None, max_bytes: int = None):
+        self.ttl = ttl if ttl is not None else float(os.environ.get('SYNTHFUZZ_RESULT_TTL', 600))
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.environ.get('SYNTHFUZZ_RESULT_MAX_BYTES', 512 * 1024 * 1024))
+        self.results = OrderedDict()  # id -> (expires, size, {name: StoredResult})
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def put(self, items: dict) -> str:
+        """
+        Store a group of items and return the ID they can be fetched under.
+
+        Args:
+            items (dict): Maps item name to a (bytes, media type) pair
+
+        Returns:
+            str: The result ID
+
+        Raises:
+            ResultTooLarge: If the items alone exceed max_bytes; storing them would evict
+                every other result and then the new one too
+        """
+        size = sum(len(data) for data, _ in items.values())
+        if size > self.max_bytes:
+            raise ResultTooLarge(f"Result of {size} bytes is over the {self.max_bytes} byte store limit")
+        result_id = uuid.uuid4().hex
+        stored = {name: StoredResult(data, media_type) for name, (data, media_type) in items.items()}
+
+        with self.lock:
+            self.results[result_id] = (time.monotonic() + self.ttl, size, stored)
+            self.total_bytes += size
+            self.evict()
+        return result_id
+
+    def get(self, result_id: str, name: str):
+        # Returns None for unknown, expired or evicted results
+        with self.lock:
+            self.evict()
+            entry = self.results.get(result_id)
+            if entry is None:
+                return None
+            return entry[2].get(name)
+
+    def evict(self):
+        now = time.monotonic()
+        # Results are kept in insertion order and share one TTL, so expired ones are at the front
+        while self.results:
+            result_id, (expires, size, _) = next(iter(self.results.items()))
+            if expires > now and self.total_bytes <= self.max_bytes:
+                break
+            del self.results[result_id]
+            self.total_bytes -= size
+
+    def stats(self) -> dict:
+        with self.lock:
+            self.evict()
+            return {
+                "results": len(self.results),
+                "bytes": self.total_bytes,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl
+            }
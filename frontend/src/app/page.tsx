@@ -44,6 +44,7 @@ const SAMPLE_AUDIO_FILES: AudioFile[] = [
 export default function Home() {
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
   const [isProcessing, setIsProcessing] = useState(false);
+  const [progress, setProgress] = useState<string | null>(null);
   const [processedAudio, setProcessedAudio] = useState<string | null>('/audio-samples/processed-electric.mp3');
   const [fullPlot, setFullPlot] = useState<string | null>('/graphs/sample-audio-graph.png');
   const [zoomedPlot, setZoomedPlot] = useState<string | null>('/graphs/sample-audio-graph-zoomed.png');
@@ -92,10 +93,12 @@ export default function Home() {
         formData.append('audio', blob, `${sampleFile.id}.wav`);
       }
 
-      console.log('[API CALL]', 'Requesting:', `${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/process-audio`, 
+      const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+      console.log('[API CALL]', 'Requesting:', `${apiUrl}/jobs`, 
         'with preset:', formData.get('preset'));
 
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/process-audio`, {
+      // Start a background job, then poll it until the result is ready
+      const response = await fetch(`${apiUrl}/jobs`, {
         method: 'POST',
         body: formData,
       });
@@ -104,27 +107,33 @@ export default function Home() {
         throw new Error('Failed to process audio');
       }
 
-      // Handle multipart response
-      const data = await response.json();
-      
+      let job = await response.json();
+      while (job.state !== 'done') {
+        if (job.state === 'failed') {
+          throw new Error(job.error || 'Failed to process audio');
+        }
+        setProgress(`${job.stage} (${Math.round(job.percent)}%)`);
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const poll = await fetch(`${apiUrl}${job.url || `/jobs/${job.id}`}`);
+        if (!poll.ok) throw new Error('Lost track of the processing job');
+        job = await poll.json();
+      }
+
+      // The job only carries result URLs; audio and plots load independently
+      const data = job.result;
+
       // Set processed audio
-      const audioBlob = await fetch(data.audio).then(r => r.blob());
-      const audioUrl = URL.createObjectURL(audioBlob);
-      setProcessedAudio(audioUrl);
+      setProcessedAudio(`${apiUrl}${data.audio}`);
       
       // Set plot images
-      const fullPlotBlob = await fetch(data.fullPlot).then(r => r.blob());
-      const fullPlotUrl = URL.createObjectURL(fullPlotBlob);
-      setFullPlot(fullPlotUrl);
-
-      const zoomedPlotBlob = await fetch(data.zoomedPlot).then(r => r.blob());
-      const zoomedPlotUrl = URL.createObjectURL(zoomedPlotBlob);
-      setZoomedPlot(zoomedPlotUrl);
+      setFullPlot(`${apiUrl}${data.fullPlot}`);
+      setZoomedPlot(`${apiUrl}${data.zoomedPlot}`);
       
     } catch (error) {
       console.error('Processing failed:', error);
     } finally {
       setIsProcessing(false);
+      setProgress(null);
     }
   };
 
@@ -237,7 +246,7 @@ export default function Home() {
                   {isProcessing ? '... processing' : '→ Run approximation'}
                 </button>
                 {isProcessing && (
-                  <p className="mt-1 text-xs text-gray-500">This usually takes about 60 seconds</p>
+                  <p className="mt-1 text-xs text-gray-500">{progress ?? 'This usually takes about 60 seconds'}</p>
                 )}
               </div>
 
@@ -290,7 +299,8 @@ export default function Home() {
                     <div>
                       <div className="font-mono mb-4">Full Signal Analysis</div>
                       <Image 
-                        src={fullPlot} 
+                        src={fullPlot}
+                        unoptimized
                         alt="Full signal analysis plot"
                         width={800}
                         height={400}
@@ -303,7 +313,8 @@ export default function Home() {
                     <div>
                       <div className="font-mono mb-4">Zoomed-in Signal Analysis</div>
                       <Image 
-                        src={zoomedPlot} 
+                        src={zoomedPlot}
+                        unoptimized
                         alt="Zoomed signal analysis plot"
                         width={800}
                         height={400}